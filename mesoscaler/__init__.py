@@ -20,60 +20,75 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 
-from importlib import reload as _reload  # DEBUG
+import importlib as _importlib
+import os as _os
 
-from . import (  # noqa: F401
-    defaults,
-    typing,
-    fileutils,
-    images,
-    landmarks,
-    atlas,
-    procs,
-    rois,
-    packaging,
-    commands,
+# NOTE: the submodules (and hence NumPy, OpenCV, DeepLabCut etc.)
+# are imported upon the first access to them, so that e.g. the
+# command-line interface does not have to load the whole package.
+_SUBMODULES = (
+    'defaults',
+    'typing',
+    'fileutils',
+    'images',
+    'landmarks',
+    'atlas',
+    'procs',
+    'rois',
+    'packaging',
+    'commands',
 )
 
-# DEBUG
-_reload(defaults)
-_reload(typing)
-_reload(fileutils)
-_reload(images)
-_reload(landmarks)
-_reload(atlas)
-_reload(procs)
-_reload(rois)
-_reload(packaging)
-_reload(commands)
+_EXPORTS = {
+    # image-related classes and procedures
+    'InputImageFiles':     'images',
+    'InputImages':         'images',
+    'collect_image_files': 'images',
+    'load_images':         'images',
 
-# image-related classes and procedures
-InputImageFiles = images.InputImageFiles
-InputImages     = images.InputImages
-collect_image_files = images.collect_image_files
-load_images = images.load_images
+    # landmark-related classes and procedures
+    'DLCOutput':             'landmarks',
+    'Landmarks':             'landmarks',
+    'Alignment':             'landmarks',
+    'predict_dlc_landmarks': 'landmarks',
+    'align_dlc_landmarks':   'landmarks',
+    'update_dlc_landmarks':  'landmarks',
 
-# landmark-related classes and procedures
-DLCOutput = landmarks.DLCOutput
-Landmarks = landmarks.Landmarks
-Alignment = landmarks.Alignment
-predict_dlc_landmarks = landmarks.predict_dlc_landmarks
-align_dlc_landmarks   = landmarks.align_dlc_landmarks
-update_dlc_landmarks  = landmarks.update_dlc_landmarks
+    # atlas_related classes and procedures
+    'Atlas': 'atlas',
 
-# atlas_related classes and procedures
-Atlas = atlas.Atlas
+    # roi-related classes and procedures
+    'ROISet':               'rois',
+    'generate_rois_batch':  'rois',
+    'iter_rois_batch':      'rois',
+    'generate_rois_single': 'rois',
 
-# roi-related classes and procedures
-ROISet = rois.ROISet
-generate_rois_batch  = rois.generate_rois_batch
-generate_rois_single = rois.generate_rois_single
+    # packaging-related classes
+    'Results': 'packaging',
 
-# packaging-related classes
-Results = packaging.Results
+    # procedures
+    'run_image_collection':    'procs',
+    'run_landmark_prediction': 'procs',
+    'run_landmark_alignment':  'procs',
+    'run_rois_generation':     'procs',
+}
 
-# procedures
-run_image_collection    = procs.run_image_collection
-run_landmark_prediction = procs.run_landmark_prediction
-run_landmark_alignment  = procs.run_landmark_alignment
-run_rois_generation     = procs.run_rois_generation
+
+def __getattr__(name: str):
+    if name in _SUBMODULES:
+        return _importlib.import_module(f".{name}", __name__)
+    elif name in _EXPORTS:
+        value = getattr(__getattr__(_EXPORTS[name]), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module '{__name__}' has no attribute '{name}'")
+
+
+def __dir__():
+    return sorted(set(globals().keys()) | set(_SUBMODULES) | set(_EXPORTS.keys()))
+
+
+if _os.environ.get('MESOSCALER_DEV'):  # DEBUG
+    from importlib import reload as _reload
+    for _name in _SUBMODULES:
+        _reload(__getattr__(_name))
@@ -20,42 +20,205 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 
-from typing import Optional, Tuple
+from pathlib import Path
+from typing import Optional, Tuple, Union
+from typing_extensions import Self
 import dataclasses as _dataclasses
+import functools as _functools
+import concurrent.futures as _futures
+import json as _json
 
+import numpy as _np
 import numpy.typing as _npt
+import scipy.io as _sio
+import imageio.v3 as _iio
+import cv2 as _cv2
 
 from . import (
+    defaults as _defaults,
     landmarks as _landmarks,
+    rois as _rois,
 )
 from .typing import (
     PathLike,
+    Hemisphere,
 )
+from .libwrapper import (
+    h5py as _h5
+)
+
+
+# the maximum number of channels that `cv2.warpAffine` accepts at once
+MAX_WARP_CHANNELS = 4
 
 
 @_dataclasses.dataclass
 class Atlas:
+    """holds a set of binary masks of the same shape,
+    stacked as a single (K, H, W) array."""
     names: Tuple[str]
-    masks: Tuple[_npt.NDArray]
+    masks: _npt.NDArray  # (K, H, W), uint8
+    sides: Optional[Tuple[Hemisphere]] = None  # `None` is taken as being all 'left'
+
+    def __post_init__(self):
+        self.masks = _np.ascontiguousarray(self.masks, dtype=_np.uint8)
+        if self.masks.ndim != 3:
+            raise ValueError(f"masks are expected to be in (K, H, W), got shape {self.masks.shape}")
+        if len(self.names) != self.masks.shape[0]:
+            raise ValueError(f"the number of names ({len(self.names)}) does not match the number of masks ({self.masks.shape[0]})")
+        if self.sides is None:
+            self.sides = ('left',) * len(self.names)
+
+    def __len__(self):
+        return len(self.names)
 
-    def to_hdf(self, outpath: PathLike):
-        raise NotImplementedError()  # TODO
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return self.masks.shape[1:]
+
+    @property
+    def packed(self) -> _npt.NDArray:
+        """the masks bit-packed along their rows (see `numpy.packbits`),
+        in shape (K, H, ceil(W / 8)). `Atlas.from_packed` restores them."""
+        return _np.packbits(self.masks > 0, axis=-1)
+
+    @classmethod
+    def from_packed(
+        cls,
+        names: Tuple[str],
+        packed: _npt.NDArray,
+        width: int,
+        sides: Optional[Tuple[Hemisphere]] = None
+    ) -> Self:
+        """the inverse of `Atlas.packed`, given the original ``width``
+        of the masks. the masks are restored as 0/255."""
+        masks = _np.unpackbits(packed, axis=-1, count=width)
+        _np.multiply(masks, _np.uint8(255), out=masks)
+        return cls(names=names, masks=masks, sides=sides)
+
+    def to_hdf(self, outpath: PathLike, **options):
+        """writes the masks as a single (K, H, W) dataset named `masks`.
+        `options` can be used to override the arguments to `create_dataset`."""
+        outpath = Path(outpath)
+        if not outpath.parent.exists():
+            outpath.parent.mkdir(parents=True)
+        if len(self) > 0:
+            options.setdefault('chunks', (1,) + self.shape)
+        options.setdefault('compression', 'gzip')
+        options.setdefault('shuffle', True)
+        with _h5.File(str(outpath), 'w') as out:
+            entry = out.create_dataset('masks', data=self.masks, **options)
+            entry.attrs['names'] = _json.dumps(self.names, indent=None)
+            entry.attrs['sides'] = _json.dumps(self.sides, indent=None)
     
     def to_matfile(self, outpath: PathLike):
-        raise NotImplementedError()  # TODO
+        outpath = Path(outpath)
+        if not outpath.parent.exists():
+            outpath.parent.mkdir(parents=True)
+        _sio.savemat(str(outpath), {
+            'names': _np.array(self.names, dtype=object),
+            'sides': _np.array(self.sides, dtype=object),
+            'masks': self.masks,
+        }, do_compression=True)
     
-    def to_png(self, outdir: PathLike):
-        raise NotImplementedError()  # TODO
+    def to_png(self, outdir: PathLike, jobs: Optional[int] = None):
+        """writes each mask as `<side>_<name>.png` in ``outdir``,
+        using ``jobs`` threads."""
+        outdir = Path(outdir)
+        if not outdir.exists():
+            outdir.mkdir(parents=True)
+
+        def write_single(idx: int):
+            outpath = outdir / f"{self.sides[idx]}_{self.names[idx]}.png"
+            _iio.imwrite(str(outpath), (self.masks[idx] > 0).view(_np.uint8) * _np.uint8(255))
+
+        with _futures.ThreadPoolExecutor(max_workers=jobs) as executor:
+            for _ in executor.map(write_single, range(len(self))):
+                pass
 
 
 def load_reference_atlas(
     atlas_dir: Optional[PathLike] = None
 ) -> Atlas:
-    raise NotImplementedError()  # TODO
+    """loads the reference masks from the ``reference_masks.h5`` file
+    in ``atlas_dir`` (defaults to the data directory of the package).
+
+    the same object is returned on repeated calls for the same file,
+    so it must not be modified."""
+    if atlas_dir is None:
+        h5path = _rois.default_reference_ROI_path()
+    else:
+        h5path = Path(atlas_dir) / _rois.ATLAS_MASK_FILE
+    return _load_atlas_file(h5path.resolve())
+
+
+@_functools.lru_cache(maxsize=1)
+def _load_atlas_file(h5path: Path) -> Atlas:
+    with _h5.File(str(h5path), 'r') as src:
+        entries = src['masks']
+        if isinstance(entries, _h5.Dataset):
+            # a single (K, H, W) dataset, as written by `Atlas.to_hdf`
+            names = tuple(_json.loads(entries.attrs['names']))
+            sides = tuple(_json.loads(entries.attrs['sides']))
+            masks = _np.empty(entries.shape, dtype=_np.uint8)
+            if masks.size > 0:
+                entries.read_direct(masks)
+            masks.flags.writeable = False
+            return Atlas(names=names, masks=masks, sides=sides)
+
+        # otherwise a group of per-ROI datasets, as in the reference masks file
+        keys = sorted(entries.keys())
+        names = tuple(entries[key].attrs['name'] for key in keys)
+        sides = tuple(entries[key].attrs['side'] for key in keys)
+        if len(keys) == 0:
+            masks = _np.zeros((0,) + _defaults.VIDEO_FRAME_SIZE[::-1], dtype=_np.uint8)
+        else:
+            masks = _np.empty((len(keys),) + entries[keys[0]].shape, dtype=_np.uint8)
+            for idx, key in enumerate(keys):
+                entries[key].read_direct(masks, dest_sel=_np.s_[idx])
+    masks.flags.writeable = False
+    return Atlas(names=names, masks=masks, sides=sides)
 
 
 def warp_atlas(
     atlas: Atlas,
-    alignment: _landmarks.Alignment
+    alignment: Union[_landmarks.Alignment, _landmarks.affine.AffineMatrix],
+    size: Optional[Tuple[int, int]] = None
 ) -> Atlas:
-    raise NotImplementedError()  # TODO
+    """warps the masks of ``atlas`` using ``alignment``, in accordance
+    with the hemisphere of each mask.
+
+    ``alignment`` may also be a precomputed warp matrix, in which case
+    it is applied to both hemispheres.
+
+    ``size`` is the (width, height) of the warped masks, and defaults
+    to the video frame size."""
+    if size is None:
+        size = _defaults.VIDEO_FRAME_SIZE
+    warped = _np.empty((len(atlas),) + tuple(size[::-1]), dtype=_np.uint8)
+    sides  = _np.array(atlas.sides)
+    for side in ('left', 'right'):
+        indices = _np.flatnonzero(sides == side)
+        if indices.size > 0:
+            if isinstance(alignment, _landmarks.Alignment):
+                warp = alignment.affine(side)
+            else:
+                warp = alignment
+            warped[indices] = _warp_stack(atlas.masks[indices], warp, size)
+    return Atlas(names=atlas.names, masks=warped, sides=atlas.sides)
+
+
+def _warp_stack(
+    masks: _npt.NDArray,
+    warp: _npt.NDArray,
+    size: Tuple[int, int]
+) -> _npt.NDArray:
+    """warps the (K, H, W) stack of masks as multi-channel images."""
+    warped = []
+    for start in range(0, masks.shape[0], MAX_WARP_CHANNELS):
+        channels = _np.ascontiguousarray(masks[start:start + MAX_WARP_CHANNELS].transpose(1, 2, 0))
+        out = _cv2.warpAffine(channels, _landmarks.affine.to_compact(warp), dsize=size, flags=_cv2.INTER_NEAREST)
+        if out.ndim == 2:
+            out = out[:, :, None]
+        warped.append(out.transpose(2, 0, 1))
+    return _np.concatenate(warped, axis=0)
@@ -20,40 +20,42 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 
-from importlib import reload as _reload  # DEBUG
+import importlib as _importlib
+import os as _os
 
 from . import (  # noqa: F401
     validate,
     root,
-    process,
-    image_collection_step,
-    landmark_prediction_step,
-    atlas_alignment_step,
-    roi_generation_step,
-    packaging_step,
 )
 
-# DEBUG
-_reload(validate)
-_reload(root)
-_reload(image_collection_step)
-_reload(landmark_prediction_step)
-_reload(atlas_alignment_step)
-_reload(roi_generation_step)
-_reload(packaging_step)
-_reload(process)
+if _os.environ.get('MESOSCALER_DEV'):  # DEBUG
+    from importlib import reload as _reload
+    _reload(validate)
+    _reload(root)
 
 
 parser = root.parser
 
 
-def parse(*args):
+def _dispatch(args=None):
+    # the first pass only determines the sub-command;
+    # its options are registered upon importing its module
+    parsed, _ = parser.parse_known_args(args)
+    module = getattr(parsed, 'module', None)
+    if module is None:
+        parser.print_help()
+        return
+    _importlib.import_module(f".{module}", __name__)
+
     parsed = vars(parser.parse_args(args))
-    fn = vars.pop('func')
+    parsed.pop('module')
+    fn = parsed.pop('func')
     fn(**parsed)
 
 
+def parse(*args):
+    _dispatch(args)
+
+
 def run():
-    parsed = vars(parser.parse_args())
-    fn = parsed.pop('func')
-    fn(**parsed)
+    _dispatch()
@@ -28,7 +28,7 @@ from .. import (
 from . import (
     validate as _validate,
 )
-from .root import commands as _commands
+from .root import command_parser as _command_parser
 
 
 def run(
@@ -56,10 +56,7 @@ def run(
     )
 
 
-parser = _commands.add_parser(
-    'atlas-alignment-step',
-    help='(step 3) aligns the reference atlas to the input images based on the predicted landmarks.'
-)
+parser = _command_parser('atlas-alignment-step')
 parser.add_argument(
     '-T',
     '--likelihood-threshold',
@@ -28,13 +28,14 @@ from .. import (
 from . import (
     validate as _validate,
 )
-from .root import commands as _commands
+from .root import command_parser as _command_parser
 
 
 def run(
     image_paths: Iterable[str],
     outdir: Optional[str] = None,
-    video_fps: Optional[float] = None
+    video_fps: Optional[float] = None,
+    jobs: Optional[int] = None
 ):
     image_paths = _validate.image_paths(image_paths)
     outdir      = _validate.output_directory(outdir)
@@ -44,13 +45,11 @@ def run(
         image_paths,
         output_dir=outdir,
         video_fps=video_fps,
+        jobs=jobs,
     )
 
 
-parser = _commands.add_parser(
-    'image-collection-step',
-    help='(step 1) collects a set of images, and rescales/packs them to be processed.'
-)
+parser = _command_parser('image-collection-step')
 parser.add_argument(
     '--video-fps',
     dest='video_fps',
@@ -58,6 +57,14 @@ parser.add_argument(
     type=float,
     help=f'the frame rate of the output images video (defaults to {_defaults.VIDEO_FRAME_RATE}).'
 )
+parser.add_argument(
+    '-j',
+    '--jobs',
+    dest='jobs',
+    metavar='NUM-JOBS',
+    type=int,
+    help='the number of threads used to load and rescale images.'
+)
 parser.add_argument(
     '-o',
     '--output-directory',
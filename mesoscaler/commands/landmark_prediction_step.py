@@ -29,13 +29,15 @@ from .. import (
 from . import (
     validate as _validate,
 )
-from .root import commands as _commands
+from .root import command_parser as _command_parser
 
 def run(
     input_directory: Optional[str] = None,
     outdir: Optional[str] = None,
     dlc_project_dir: Optional[str] = None,
-    video_fps: Optional[float] = None
+    video_fps: Optional[float] = None,
+    batch_size: Optional[int] = None,
+    gpu: Optional[int] = None
 ):
     indir = _validate.input_directory(input_directory)
     outdir = _validate.output_directory(outdir)
@@ -47,13 +49,12 @@ def run(
         indir,
         outdir,
         dlc_project_dir=dlc_project_dir,
-        video_fps=video_fps
+        video_fps=video_fps,
+        batch_size=batch_size,
+        gpu=gpu
     )
 
-parser = _commands.add_parser(
-    'landmark-prediction-step',
-    help='(step 2) predicts reference landmarks from the (collected/packed) input images.'
-)
+parser = _command_parser('landmark-prediction-step')
 parser.add_argument(
     '--video-fps',
     dest='video_fps',
@@ -68,6 +69,21 @@ parser.add_argument(
     metavar='PROJECT-DIR',
     help='the MesoNet DeepLabCut project directory to be used for landmark prediction. If not supplied, it tries to read from the `MESONET_DLC_PROJECT_DIR` environment variable.'
 )
+parser.add_argument(
+    '-B',
+    '--batch-size',
+    dest='batch_size',
+    metavar='NUM-FRAMES',
+    type=int,
+    help=f'the number of frames to be processed at once by the DeepLabCut network (defaults to {_defaults.DLC_BATCH_SIZE}).'
+)
+parser.add_argument(
+    '--gpu',
+    dest='gpu',
+    metavar='GPU-INDEX',
+    type=int,
+    help='the index of the GPU to be used for landmark prediction (lets DeepLabCut decide if not supplied).'
+)
 parser.add_argument(
     '-o',
     '--output-directory',
@@ -31,7 +31,7 @@ from .. import (
 from . import (
     validate as _validate
 )
-from .root import commands as _commands
+from .root import command_parser as _command_parser
 
 
 def run(
@@ -66,10 +66,7 @@ def run(
     )
 
 
-parser = _commands.add_parser(
-    'packaging-step',
-    help='single-step 5: pack all the results into single files for each image.'
-)
+parser = _command_parser('packaging-step')
 parser.add_argument(
     '-F',
     '--output-file-type',
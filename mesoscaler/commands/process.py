@@ -22,6 +22,9 @@
 
 from typing import Optional, Iterable
 from pathlib import Path
+import concurrent.futures as _futures
+import os as _os
+import shutil as _shutil
 import tempfile as _tempfile
 
 from ..typing import (
@@ -30,11 +33,12 @@ from ..typing import (
 from .. import (
     defaults as _defaults,
     procs as _procs,
+    fileutils as _fileutils,
 )
 from . import (
     validate as _validate,
 )
-from .root import commands as _commands
+from .root import command_parser as _command_parser
 
 
 def run(
@@ -48,6 +52,7 @@ def run(
     video_fps: Optional[float] = None,
     rois_file_type: ResultsFileType = 'hdf',  # this value is intentionally made un-configurable
     resize_rois: bool = True,  # this value is intentionally made un-configurable
+    chunk_size: Optional[int] = None,
 ):
     image_paths = _validate.image_paths(image_paths)
     output_dir  = _validate.output_directory(output_dir)
@@ -56,25 +61,45 @@ def run(
         return
     if (output_file_type is None):
         return
-    process_dir = Path(_tempfile.mkdtemp(prefix='temp-ksm-process'))
-    collect_dir = process_dir / 'collected'
-    landmarks_dir = process_dir / 'landmarks'
-    rois_dir = process_dir / 'rois'
-    # TODO:
-    # better wrapping the following procedures
-    # using a try block so that the error message becomes minimal?
-    try:
+    if chunk_size is None:
+        chunk_size = _defaults.PROCESS_CHUNK_SIZE
+
+    # NOTE: DLC may call `chdir` during the (concurrent) prediction step,
+    # so every path must be made absolute beforehand
+    image_paths = [path.resolve() for path in image_paths]
+    output_dir  = output_dir.resolve()
+    image_names = _fileutils.unique_names_from_path(image_paths)
+    chunks = tuple(
+        (image_paths[start:start + chunk_size], image_names[start:start + chunk_size])
+        for start in range(0, len(image_paths), chunk_size)
+    )
+    process_dir = Path(_tempfile.mkdtemp(prefix='temp-ksm-process')).resolve()
+
+    def _collect(idx: int) -> Path:
+        paths, names = chunks[idx]
+        chunk_dir = process_dir / f"chunk{str(idx).zfill(_fileutils.required_number_of_digits(len(chunks)))}"
         _procs.run_image_collection(
-            image_paths,
-            output_dir=collect_dir,
-            video_fps=video_fps
+            paths,
+            output_dir=chunk_dir / 'collected',
+            video_fps=video_fps,
+            image_names=names
         )
+        return chunk_dir
+
+    def _predict(chunk_dir: Path) -> Path:
         _procs.run_landmark_prediction(
-            collect_dir,
-            landmarks_dir,
+            chunk_dir / 'collected',
+            chunk_dir / 'landmarks',
             dlc_project_dir=dlc_project_dir,
             video_fps=video_fps
         )
+        return chunk_dir
+
+    def _finalize(predicted: _futures.Future):
+        chunk_dir = predicted.result()
+        collect_dir = chunk_dir / 'collected'
+        landmarks_dir = chunk_dir / 'landmarks'
+        rois_dir = chunk_dir / 'rois'
         _procs.run_landmark_alignment(
             landmarks_dir,
             landmarks_dir,
@@ -83,12 +108,16 @@ def run(
             separate_sides=separate_sides,
             video_fps=video_fps,
         )
+        # NOTE: the chunks are already finalized concurrently, so the ROIs are
+        # generated in this thread, rather than each chunk forking its own pool
+        # of processes (while the DLC thread is running)
         _procs.run_rois_generation(
             collect_dir,
             landmarks_dir,
             rois_dir,
             file_type=rois_file_type,
             resize=resize_rois,
+            jobs=1,
         )
         _procs.run_packaging_all_results(
             metadata_dir=collect_dir,
@@ -98,15 +127,34 @@ def run(
             output_dir=output_dir,
             filetype=output_file_type
         )
+        _shutil.rmtree(chunk_dir)
+
+    # the chunks are run through a pipeline, so that the collection (I/O-bound)
+    # and the post-processing of the other chunks overlap with the DLC inference.
+    # the landmark prediction is kept on a single worker as it occupies the GPU.
+    #
+    # TODO:
+    # better wrapping the following procedures
+    # using a try block so that the error message becomes minimal?
+    try:
+        with _futures.ThreadPoolExecutor(max_workers=1) as predictor, \
+                _futures.ThreadPoolExecutor(max_workers=_os.cpu_count()) as workers:
+            # collection runs ahead of the prediction by a few chunks at most,
+            # to keep the amount of intermediate data bounded
+            collected = [workers.submit(_collect, idx) for idx in range(min(2, len(chunks)))]
+            finalized = []
+            for idx in range(len(chunks)):
+                if idx + 2 < len(chunks):
+                    collected.append(workers.submit(_collect, idx + 2))
+                predicted = predictor.submit(_predict, collected[idx].result())
+                finalized.append(workers.submit(_finalize, predicted))
+            for future in finalized:
+                future.result()
     finally:
-        import shutil
-        shutil.rmtree(process_dir)
+        _shutil.rmtree(process_dir)
 
 
-parser = _commands.add_parser(
-    'process',
-    help='end-to-end processing of the given set of images.'
-)
+parser = _command_parser('process')
 parser.add_argument(
     '-F',
     '--output-file-type',
@@ -137,6 +185,13 @@ parser.add_argument(
     type=float,
     help=f'the frame rate of the output images video (defaults to {_defaults.VIDEO_FRAME_RATE}).'
 )
+parser.add_argument(
+    '--chunk-size',
+    dest='chunk_size',
+    metavar='NUM-IMAGES',
+    type=int,
+    help=f'the number of images to be processed at once in the pipeline (defaults to {_defaults.PROCESS_CHUNK_SIZE}).'
+)
 parser.add_argument(
     '-o',
     '--output-directory',
@@ -30,7 +30,7 @@ from .. import (
 from . import (
     validate as _validate,
 )
-from .root import commands as _commands
+from .root import command_parser as _command_parser
 
 
 def run(
@@ -39,6 +39,8 @@ def run(
     outdir: Optional[str] = None,
     resize: bool = True,  # this value is intentionally made un-configurable
     file_type: ResultsFileType = 'hdf',  # this value is intentionally made un-configurable
+    jobs: Optional[int] = None,
+    consolidate: bool = False,
 ):
     aligndir = _validate.input_directory(input_directory)
     metadir  = _validate.input_directory(metadir)
@@ -53,14 +55,13 @@ def run(
         aligndir,
         outdir,
         file_type=file_type,
-        resize=resize
+        resize=resize,
+        jobs=jobs,
+        consolidate=consolidate
     )
 
 
-parser = _commands.add_parser(
-    'roi-generation-step',
-    help='(step 4) generate roi masks for the images based on the aligned reference atlas.'
-)
+parser = _command_parser('roi-generation-step')
 parser.add_argument(
     '-M',
     '--metadata-directory',
@@ -68,6 +69,20 @@ parser.add_argument(
     metavar='METADATA-DIRECTORY',
     help='the path to the metadata directory (which contains files generated in the image-collection-step). If not supplied, it tries to find it from the current directory.'
 )
+parser.add_argument(
+    '-j',
+    '--jobs',
+    dest='jobs',
+    metavar='NUM-JOBS',
+    type=int,
+    help='the number of processes used to generate ROIs (defaults to the number of CPUs).'
+)
+parser.add_argument(
+    '--consolidate',
+    dest='consolidate',
+    action='store_true',
+    help='write all the ROI sets into a single HDF5 file (all_rois.h5), instead of one file per image.'
+)
 parser.add_argument(
     '-o',
     '--output-directory',
@@ -28,3 +28,59 @@ parser = _Parser(
     description='aligns reference atlas to a set of images.'
 )
 commands = parser.add_subparsers()
+
+# NOTE: only the names of the sub-commands are registered here.
+# the module of a sub-command (under `mesoscaler.commands`) gets imported,
+# and adds its options to its parser, only when the sub-command is invoked.
+command_modules = dict()
+
+
+def add_command(name: str, module: str, help: str):
+    command = commands.add_parser(name, help=help, add_help=False)
+    command.set_defaults(module=module)
+    command_modules[name] = module
+
+
+def command_parser(name: str) -> _Parser:
+    """returns the parser of the sub-command ``name``
+    (used from the module of the sub-command)."""
+    command = commands.choices[name]
+    command.add_argument(
+        '-h',
+        '--help',
+        action='help',
+        help='show this help message and exit'
+    )
+    return command
+
+
+add_command(
+    'process',
+    'process',
+    help='end-to-end processing of the given set of images.'
+)
+add_command(
+    'image-collection-step',
+    'image_collection_step',
+    help='(step 1) collects a set of images, and rescales/packs them to be processed.'
+)
+add_command(
+    'landmark-prediction-step',
+    'landmark_prediction_step',
+    help='(step 2) predicts reference landmarks from the (collected/packed) input images.'
+)
+add_command(
+    'atlas-alignment-step',
+    'atlas_alignment_step',
+    help='(step 3) aligns the reference atlas to the input images based on the predicted landmarks.'
+)
+add_command(
+    'roi-generation-step',
+    'roi_generation_step',
+    help='(step 4) generate roi masks for the images based on the aligned reference atlas.'
+)
+add_command(
+    'packaging-step',
+    'packaging_step',
+    help='single-step 5: pack all the results into single files for each image.'
+)
@@ -23,16 +23,20 @@
 IMAGE_SUFFIXES = ('.png', '.tif', '.tiff')
 VIDEO_FRAME_SIZE = (512, 512)
 VIDEO_FRAME_RATE = 1
+VIDEO_FOURCC = 'mp4v'
 
 COLLECTED_IMAGES_VIDEO_NAME = "images.mp4"
 COLLECTED_IMAGES_METADATA_NAME = "metadata.csv"
 
 PREDICTED_LANDMARKS_VIDEO_NAME = "images_with_landmarks.mp4"
 PREDICTED_LANDMARKS_TABLE_NAME = "landmarks.csv"
+DLC_BATCH_SIZE = 32
 LANDMARK_LIKELIHOOD_THRESHOLD  = 0.85
 MIN_VALID_POINTS_ALIGNED       = 3
 ALIGNMENT_TABLE_NAME           = "reference_to_images_transform.csv"
 ALIGNED_LANDMARKS_VIDEO_NAME   = "images_with_aligned_landmarks.mp4"
 ALIGNED_LANDMARKS_TABLE_NAME   = "aligned_landmarks.csv"
+CONSOLIDATED_ROIS_FILE_NAME    = "all_rois.h5"
 
 PACKAGE_FILE_TYPE = 'hdf'
+PROCESS_CHUNK_SIZE = 32
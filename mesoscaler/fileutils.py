@@ -22,33 +22,39 @@
 
 from typing import Optional, Iterable, Tuple, Union # noqa: F401
 from pathlib import Path
+import functools as _functools
 import math as _math
 import re as _re
 
+import pandas as _pd
+
+from . import (
+    libwrapper as _libwrapper,
+)
 from .typing import (
+    PathLike,
     ResultsFileType,
 )
 
 
+DIGITS_PATTERN = _re.compile("([0-9]+)")
+PARQUET_SUFFIX = '.parquet'
+
+
+@_functools.lru_cache(maxsize=4096)
 def index_name(text: str) -> Tuple[Union[str, int]]:
     """used for sorting file names"""
-    digits = _re.compile("([0-9]+)")
-    return tuple(int(item) if item.isdigit() else item.lower() for item in digits.split(text))
+    return tuple(int(item) if item.isdigit() else item.lower() for item in DIGITS_PATTERN.split(text))
 
 
 def unique_names_from_path(paths: Iterable[Path]) -> Tuple[str]:
     NUM_MAX_TEST = 10
 
-    def with_level(i):
-        return [str(path.relative_to(path.parents[i])) for path in paths]
-
-    def is_unique(names):
-        return len(set(names)) == len(names)
-
-    for i in range(NUM_MAX_TEST):
-        names = with_level(i)
-        if is_unique(names):
-            return tuple(names)
+    parts = tuple(Path(path).parts for path in paths)
+    for level in range(1, NUM_MAX_TEST + 1):
+        # compares the trailing `level` components without building strings
+        if len(set(item[-level:] for item in parts)) == len(parts):
+            return tuple(str(Path(*item[-level:])) for item in parts)
     raise RuntimeError('failed to find unique names from a set of paths')
 
 
@@ -64,3 +70,34 @@ def get_roi_file_suffix(filetype: ResultsFileType) -> str:
         return '.mat'
     else:
         raise ValueError(f"ROI file type expected to be one of ('hdf', 'matlab'), got {repr(filetype)}")
+
+
+def table_path(path: PathLike) -> Path:
+    """returns the Parquet version of the CSV table `path`, in case it
+    already exists, or in case `pyarrow` is available and there is
+    no CSV version yet. returns `path` otherwise."""
+    path = Path(path)
+    parquet = path.with_suffix(PARQUET_SUFFIX)
+    if parquet.exists() or (_libwrapper.HAS_PYARROW and (not path.exists())):
+        return parquet
+    return path
+
+
+def write_table(
+    table: _pd.DataFrame,
+    outpath: PathLike,
+    index: bool = False
+):
+    """writes `table` in the Parquet format if `outpath` has
+    the `.parquet` suffix, and in the CSV format otherwise."""
+    if Path(outpath).suffix == PARQUET_SUFFIX:
+        table.to_parquet(str(outpath), engine='pyarrow', compression='zstd', index=index)
+    else:
+        table.to_csv(str(outpath), header=True, index=index)
+
+
+def read_table(path: PathLike) -> _pd.DataFrame:
+    """the counterpart of `write_table`."""
+    if Path(path).suffix == PARQUET_SUFFIX:
+        return _pd.read_parquet(str(path), engine='pyarrow')
+    return _pd.read_csv(str(path))
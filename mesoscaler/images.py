@@ -23,6 +23,9 @@
 from pathlib import Path
 from typing import Optional, Union, Iterable, Tuple
 import dataclasses
+import collections as _collections
+import concurrent.futures as _futures
+import os as _os
 
 import numpy as _np
 import numpy.typing as _npt
@@ -33,9 +36,20 @@ import cv2 as _cv2
 from . import (
     defaults as _defaults,
     fileutils as _fileutils,
+    libwrapper as _libwrapper,
 )
 from .typing import PathLike, Suffixes, Number, InputImageFiles
 
+# the upper bound for the default number of threads used
+# to read the image files (to avoid thrashing e.g. HDDs)
+MAX_LOADING_THREADS = 8
+
+# the maximum number of rescaled frames waiting to be encoded
+MAX_PENDING_FRAMES = 64
+
+# the weights for R, G and B used for the RGB-to-grayscale conversion
+RGB_TO_GRAY_WEIGHTS = _np.array([0.299, 0.587, 0.114], dtype=_np.float32)
+
 
 @dataclasses.dataclass
 class InputImages:
@@ -48,20 +62,19 @@ class InputImages:
     Self = 'InputImages'
 
     def __post_init__(self):
-        size = sum(self.pages)
-        self.shapes = _np.zeros((len(self.images), 2), dtype=_np.int_)
-        self.image_indexer = _np.zeros(size, dtype=_np.int_)
-        self.page_indexer  = _np.zeros(size, dtype=_np.int_)
-        start = 0
-        for image_idx, (width, img) in enumerate(zip(self.pages, self.images)):
-            window = slice(start, start + width)
-            if width == 1:
-                self.shapes[image_idx, :] = img.shape
-            else:
-                self.shapes[image_idx, :] = img.shape[1:]
-            self.image_indexer[window] = image_idx
-            self.page_indexer[window] = _np.arange(width)
-            start += width
+        pages = _np.asarray(self.pages, dtype=_np.int_).reshape(-1)
+        starts = _np.cumsum(pages) - pages
+        self.shapes = _np.array(
+            [img.shape if width == 1 else img.shape[1:] for width, img in zip(self.pages, self.images)],
+            dtype=_np.int_
+        ).reshape((-1, 2))
+        self.image_indexer = _np.repeat(_np.arange(pages.size, dtype=_np.int_), pages)
+        self.page_indexer  = _np.arange(self.image_indexer.size, dtype=_np.int_) - _np.repeat(starts, pages)
+        # (num_pages, H, W) views of the images, so that
+        # single- and multi-page images are accessed in the same way
+        self._stacks = tuple(
+            img[None] if width == 1 else img for width, img in zip(self.pages, self.images)
+        )
 
     def __len__(self):
         return len(self.pages)
@@ -69,20 +82,16 @@ class InputImages:
     def __getitem__(self, idx):
         if not isinstance(idx, int):
             raise ValueError(f'InputImages only accepts int indices, got {type(idx)}')
-        image_idx = self.image_indexer[idx]
-        if self.pages[image_idx] > 1:
-            page_idx  = self.page_indexer[idx]
-            return self.images[image_idx][page_idx]
-        else:
-            return self.images[image_idx]
+        return self._stacks[self.image_indexer[idx]][self.page_indexer[idx]]
 
     def __iter__(self):
-        for pages, image in zip(self.pages, self.images):
-            if pages == 1:
-                yield image
-            else:
-                for page in range(pages):
-                    yield image[page]
+        for stack in self._stacks:
+            yield from stack
+
+    @property
+    def num_pages(self) -> int:
+        """the total number of pages in the images."""
+        return self.image_indexer.size
 
     @property
     def widths(self) -> _npt.NDArray:
@@ -103,27 +112,31 @@ def collect_image_files(input_dir: PathLike, suffixes: Optional[Suffixes] = None
     if isinstance(suffixes, str):
         suffixes = (suffixes, )
     input_dir = Path(input_dir)
-    files = []
-    for suffix in suffixes:
-        for child in input_dir.glob(f'*{suffix}'):
-            files.append(child)
+    suffixes = frozenset(suffixes)
+    files = [child for child in input_dir.iterdir() if child.suffix in suffixes]
     return tuple(sorted(files, key=lambda file: _fileutils.index_name(str(file))))
 
 
 def load_images(
     input_files: Union[InputImageFiles, PathLike],
-    suffixes: Optional[Suffixes] = None
+    suffixes: Optional[Suffixes] = None,
+    jobs: Optional[int] = None
 ) -> InputImages:
-    """``suffixes`` will only be used if ``input_files`` is a path-like object."""
+    """``suffixes`` will only be used if ``input_files`` is a path-like object.
+
+    the files are read using ``jobs`` threads (defaults to the number of CPUs,
+    up to ``MAX_LOADING_THREADS``)."""
     if isinstance(input_files, (str, Path)):
         input_files = collect_image_files(input_files, suffixes=suffixes)
+    input_files = tuple(Path(path) for path in input_files)
+    if jobs is None:
+        jobs = min(_os.cpu_count() or 1, MAX_LOADING_THREADS)
 
     def load_single(path: Path) -> Tuple[_npt.NDArray, int]:
-        img = _iio.v3.imread(str(path))
+        img = read_image(path)
         if img.shape[-1] == 3:
             # probably in RGB
-            dtype = img.dtype
-            img = img.mean(-3).astype(dtype)
+            img = rgb_to_grayscale(img)
 
         if path.suffix.startswith('.tif'):
             # heuristic parsing of the image number
@@ -144,41 +157,108 @@ def load_images(
 
     pages  = []
     images = []
-    for srcpath in input_files:
-        img, num = load_single(Path(srcpath))
-        images.append(img)
-        pages.append(num)
+    with _futures.ThreadPoolExecutor(max_workers=max(1, min(jobs, len(input_files)))) as executor:
+        for img, num in executor.map(load_single, input_files):
+            images.append(img)
+            pages.append(num)
     return InputImages(pages=tuple(pages), images=tuple(images))
 
 
+def read_image(path: PathLike) -> _npt.NDArray:
+    """reads the image file at ``path``.
+
+    uncompressed TIFF files are memory-mapped (if `tifffile` is available),
+    so that the pages of a large stack are only read when they are accessed.
+    the other files are read into memory using `imageio`."""
+    path = Path(path)
+    if path.suffix.lower().startswith('.tif') and _libwrapper.HAS_TIFFFILE:
+        with _libwrapper.tifffile.TiffFile(str(path)) as tif:
+            series = tif.series[0]
+            mappable = (series.dataoffset is not None)
+        if mappable:
+            return _libwrapper.tifffile.memmap(str(path), series=0, mode='r')
+    return _iio.v3.imread(str(path))
+
+
+def rgb_to_grayscale(img: _npt.NDArray) -> _npt.NDArray:
+    """converts the RGB image (or the stack of RGB images) in shape (..., 3)
+    into grayscale, using the ITU-R BT.601 luma weights."""
+    if img.dtype in (_np.uint8, _np.uint16, _np.float32):
+        if img.ndim == 3:
+            return _cv2.cvtColor(img, _cv2.COLOR_RGB2GRAY)
+        elif img.ndim == 4:
+            gray = _np.empty(img.shape[:-1], dtype=img.dtype)
+            for idx, page in enumerate(img):
+                gray[idx] = _cv2.cvtColor(page, _cv2.COLOR_RGB2GRAY)
+            return gray
+    gray = _np.einsum('...c,c->...', img, RGB_TO_GRAY_WEIGHTS)
+    if _np.issubdtype(img.dtype, _np.integer):
+        gray = _np.rint(gray)
+    return gray.astype(img.dtype)
+
+
 def write_rescaled_video(
     outpath: PathLike,
     images: InputImages,
-    fps: Optional[Number] = None
+    fps: Optional[Number] = None,
+    jobs: Optional[int] = None
 ):
+    """rescales the pages of ``images`` to the video frame size,
+    and writes them out as a video file.
+
+    the rescaling is performed with ``jobs`` threads
+    (uses the default of `ThreadPoolExecutor` if not specified),
+    while the rescaled frames are streamed to `cv2.VideoWriter` in order.
+    up to ``MAX_PENDING_FRAMES`` pages are read ahead of the encoder: pages
+    of memory-mapped stacks are read from the disk by the worker threads,
+    in parallel with the encoding of the preceding frames."""
     if fps is None:
         fps = _defaults.VIDEO_FRAME_RATE
     outpath = Path(outpath)
-    rescaled = []
-    for img, pagenum in zip(images.images, images.pages):
-        if pagenum > 1:
-            for page in range(pagenum):
-                rimg = _cv2.resize(img[page], _defaults.VIDEO_FRAME_SIZE,
-                                   interpolation=_cv2.INTER_LINEAR)
-                rescaled.append(
-                    _np.stack([rimg, rimg, rimg], axis=-1)
-                )
-        else:
-            rimg = _cv2.resize(img, _defaults.VIDEO_FRAME_SIZE,
-                               interpolation=_cv2.INTER_LINEAR)
-            rescaled.append(
-                _np.stack([rimg, rimg, rimg], axis=-1)
-            )
-    rescaled = _np.stack(rescaled, axis=0)
-
     if not outpath.parent.exists():
         outpath.parent.mkdir(parents=True)
-    _iio.v3.imwrite(str(outpath), rescaled, fps=fps)
+
+    def rescale_single(page: _npt.NDArray) -> _npt.NDArray:
+        # NOTE: for memory-mapped pages, this is where the disk read occurs
+        page = _np.ascontiguousarray(page)
+        rimg = _cv2.resize(page, _defaults.VIDEO_FRAME_SIZE,
+                           interpolation=_cv2.INTER_LINEAR)
+        return _cv2.cvtColor(as_uint8(rimg), _cv2.COLOR_GRAY2BGR)
+
+    writer = _cv2.VideoWriter(
+        str(outpath),
+        _cv2.VideoWriter_fourcc(*_defaults.VIDEO_FOURCC),
+        fps,
+        _defaults.VIDEO_FRAME_SIZE
+    )
+    if not writer.isOpened():
+        raise RuntimeError(f"failed to open the video file for writing: {outpath}")
+    try:
+        with _futures.ThreadPoolExecutor(max_workers=jobs) as executor:
+            pending = _collections.deque()
+            for page in images:
+                pending.append(executor.submit(rescale_single, page))
+                if len(pending) > MAX_PENDING_FRAMES:
+                    writer.write(pending.popleft().result())
+            while len(pending) > 0:
+                writer.write(pending.popleft().result())
+    finally:
+        writer.release()
+
+
+def as_uint8(img: _npt.NDArray) -> _npt.NDArray:
+    """converts the image into 8-bit unsigned integers, in the way
+    imageio does: 16-bit images are shifted by 8 bits, and the others
+    are scaled to fit their min--max range."""
+    if img.dtype == _np.uint8:
+        return img
+    elif img.dtype == _np.uint16:
+        return _np.right_shift(img, 8).astype(_np.uint8)
+    vmin, vmax = _np.nanmin(img), _np.nanmax(img)
+    if vmax == vmin:
+        return _np.zeros(img.shape, dtype=_np.uint8)
+    scaled = (img.astype(_np.float32) - vmin) * (255 / (vmax - vmin))
+    return _np.rint(scaled).astype(_np.uint8)
 
 
 def write_metadata_table(
@@ -187,38 +267,32 @@ def write_metadata_table(
     image_names: Optional[Iterable[str]] = None
 ):
     outpath = Path(outpath)
-    image_names = tuple(image_names)
-
-    data = []
     if image_names is not None:
+        image_names = tuple(image_names)
         if len(image_names) != len(images):
             raise ValueError(
                 f"the length of the image names ({len(image_names)}) "
                 f"does not match the length of the images ({len(images)})"
             )
-    
-    widths = images.widths
-    heights = images.heights
-    pages = images.pages
-    for idx in range(len(images)):
-        for page in range(pages[idx]):
-            _data = {}
-            if image_names is not None:
-                _data['Image'] = image_names[idx]
-            _data['Frame'] = page + 1
-            _data['Width'] = widths[idx]
-            _data['Height'] = heights[idx]
-            _data['TotalFrames'] = pages[idx]
-            data.append(_data)
+
+    # one row per page
+    image_idx = images.image_indexer
+    data = dict()
+    if image_names is not None:
+        data['Image'] = _np.array(image_names, dtype=object)[image_idx]
+    data['Frame'] = images.page_indexer + 1
+    data['Width'] = images.widths[image_idx]
+    data['Height'] = images.heights[image_idx]
+    data['TotalFrames'] = _np.asarray(images.pages, dtype=_np.int_)[image_idx]
     if not outpath.parent.exists():
         outpath.parent.mkdir(parents=True)
-    _pd.DataFrame(data).to_csv(str(outpath), header=True, index=(image_names is None))
+    _fileutils.write_table(_pd.DataFrame(data), outpath, index=(image_names is None))
 
 
 def load_metadata_table(
     path: PathLike
 ) -> _pd.DataFrame:
-    return _pd.read_csv(str(path))
+    return _fileutils.read_table(path)
 
 
 def collected_images_video_path(output_dir: PathLike) -> Path:
@@ -226,4 +300,4 @@ def collected_images_video_path(output_dir: PathLike) -> Path:
 
 
 def collected_images_metadata_path(output_dir: PathLike) -> Path:
-    return Path(output_dir) / _defaults.COLLECTED_IMAGES_METADATA_NAME
+    return _fileutils.table_path(Path(output_dir) / _defaults.COLLECTED_IMAGES_METADATA_NAME)
@@ -20,7 +20,7 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 
-from importlib import reload as _reload  # DEBUG
+import os as _os
 
 from . import (  # noqa: F401
     affine,
@@ -31,28 +31,33 @@ from . import (  # noqa: F401
     alignment,
 )
 
-# DEBUG
-_reload(affine)
-_reload(base)
-_reload(paths)
-_reload(reference)
-_reload(prediction)
-_reload(alignment)
+if _os.environ.get('MESOSCALER_DEV'):  # DEBUG
+    from importlib import reload as _reload
+    _reload(affine)
+    _reload(base)
+    _reload(paths)
+    _reload(reference)
+    _reload(prediction)
+    _reload(alignment)
 
 
 DLCOutput = base.DLCOutput
+LazyVideo = base.LazyVideo
 Landmarks = base.Landmarks
+LandmarkSeries = base.LandmarkSeries
 Alignment = base.Alignment
 
 predict_dlc_landmarks = prediction.predict_dlc_landmarks
 load_reference_landmarks  = base.load_reference_landmarks
 landmarks_from_dlc_output = base.landmarks_from_dlc_output
+read_dlc_table        = base.read_dlc_table
 write_labeled_video   = base.write_labeled_video
 write_dlc_landmarks   = base.write_dlc_landmarks
 write_alignment_table = base.write_alignment_table
 load_alignment_table  = base.load_alignment_table
 align_dlc_landmarks   = alignment.align_dlc_landmarks
 update_dlc_landmarks  = alignment.update_dlc_landmarks
+warp_all_frames       = base.warp_all_frames
 
 predicted_landmarks_video_path = paths.predicted_landmarks_video_path
 predicted_landmarks_table_path = paths.predicted_landmarks_table_path
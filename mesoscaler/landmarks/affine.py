@@ -28,6 +28,7 @@ import cv2 as _cv2
 
 from .. import (
     defaults as _defaults,
+    libwrapper as _libwrapper,
 )
 
 
@@ -35,9 +36,15 @@ AffineCompact = _npt.NDArray
 AffineSquare  = _npt.NDArray
 AffineMatrix  = Union[AffineCompact, AffineSquare]
 
+# the (1-norm) condition number of the normal equations in `estimate`,
+# above which the points are taken as degenerate (e.g. collinear), and
+# `lstsq` is used instead. well-spread landmarks in pixel coordinates
+# give condition numbers of around 1e6-1e7.
+MAX_NORMAL_CONDITION = 1e10
+
 
 def identity() -> AffineCompact:
-    return to_compact(_np.eye(3))
+    return _np.eye(2, 3)
 
 
 def estimate(
@@ -51,21 +58,112 @@ def estimate(
     `src[i]` and `dst[i]` must match each other."""
     N   = src.shape[0]
     assert dst.shape[0] == N
-    src = _np.concatenate([src, _np.ones((N, 1), dtype=src.dtype)], axis=1)  # (N, 3)
-    X_in = _np.concatenate([src, _np.zeros((N, 6), dtype=src.dtype), src], axis=1)  # (N, 12)
-    X_in = X_in.reshape((N, 2, 6), order='C')  # (N, 2, 6)
-    X_in = X_in.reshape((N * 2, 6), order='C')  # (N*2, 6)
-    x_out = dst.reshape((-1, 1), order='C')  # (N*2, 1)
-    a, _, _, _ = _np.linalg.lstsq(X_in, x_out, rcond=None)  # (6, 1): the rest are `residuals`, `rank` and `s`
-    return a.reshape((2, 3), order='C')
+    if _libwrapper.HAS_NUMBA:
+        out = _np.empty((2, 3), dtype=_np.float64)
+        if _estimate_kernel(src, dst, out):
+            return out
+        # otherwise degenerate: fall back to `lstsq` below
+    # NOTE: the x- and the y- rows of the matrix do not interact,
+    # so they are solved as two 3-parameter problems sharing the same LHS
+    X_in = _np.column_stack([src, _np.ones(N, dtype=src.dtype)]).astype(_np.float64)  # (N, 3)
+    G = X_in.T @ X_in
+    # NOTE: (nearly) singular normal equations are rarely reported by `solve`,
+    # which would then return an arbitrary matrix
+    if _np.linalg.cond(G, 1) <= MAX_NORMAL_CONDITION:
+        a = _np.linalg.solve(G, X_in.T @ dst)  # (3, 2)
+    else:
+        # degenerate (e.g. collinear) points: the minimum-norm solution
+        a, _, _, _ = _np.linalg.lstsq(X_in, dst, rcond=None)  # (3, 2): the rest are `residuals`, `rank` and `s`
+    return _np.ascontiguousarray(a.T)
+
+
+@_libwrapper.njit(cache=True)
+def _estimate_kernel(src, dst, out):
+    """solves the normal equations of `estimate` in the closed form.
+    returns False (leaving `out` unspecified) if the points are degenerate,
+    i.e. the condition number exceeds `MAX_NORMAL_CONDITION`."""
+    # G = X.T @ X with X = [src | 1]; symmetric
+    sxx = sxy = syy = sx = sy = 0.0
+    bx = _np.zeros(2)  # X.T @ dst, row-by-row
+    by = _np.zeros(2)
+    bc = _np.zeros(2)
+    N = src.shape[0]
+    for i in range(N):
+        x = src[i, 0]
+        y = src[i, 1]
+        sxx += x * x
+        sxy += x * y
+        syy += y * y
+        sx += x
+        sy += y
+        for k in range(2):
+            bx[k] += x * dst[i, k]
+            by[k] += y * dst[i, k]
+            bc[k] += dst[i, k]
+    n = float(N)
+    # cofactors of G
+    c00 = syy * n - sy * sy
+    c01 = sx * sy - sxy * n
+    c02 = sxy * sy - syy * sx
+    c11 = sxx * n - sx * sx
+    c12 = sxy * sx - sxx * sy
+    c22 = sxx * syy - sxy * sxy
+    det = sxx * c00 + sxy * c01 + sx * c02
+    if det == 0.0:
+        return False
+    # the 1-norm condition number, using the cofactors for the inverse
+    norm = max(abs(sxx) + abs(sxy) + abs(sx), abs(sxy) + abs(syy) + abs(sy), abs(sx) + abs(sy) + n)
+    inv_norm = max(
+        abs(c00) + abs(c01) + abs(c02),
+        abs(c01) + abs(c11) + abs(c12),
+        abs(c02) + abs(c12) + abs(c22)
+    ) / abs(det)
+    if norm * inv_norm > MAX_NORMAL_CONDITION:
+        return False
+    for k in range(2):
+        out[k, 0] = (c00 * bx[k] + c01 * by[k] + c02 * bc[k]) / det
+        out[k, 1] = (c01 * bx[k] + c11 * by[k] + c12 * bc[k]) / det
+        out[k, 2] = (c02 * bx[k] + c12 * by[k] + c22 * bc[k]) / det
+    return True
+
+
+def estimate_batch(
+    src: _npt.NDArray,
+    dst: _npt.NDArray
+) -> _npt.NDArray:
+    """the batch version of `estimate`.
+
+    `src` and `dst` are the F sets of N x 2-D points, in shape (F, N, 2).
+    returns the F Affine matrices in shape (F, 2, 3)."""
+    F, N = src.shape[:2]
+    assert dst.shape[:2] == (F, N)
+    X_in = _np.concatenate([src, _np.ones((F, N, 1), dtype=src.dtype)], axis=2).astype(_np.float64)  # (F, N, 3)
+    # normal equations for each of the F sets
+    G = _np.einsum('fni,fnj->fij', X_in, X_in)  # (F, 3, 3)
+    b = _np.einsum('fni,fnk->fik', X_in, dst)  # (F, 3, 2)
+    out = _np.empty((F, 2, 3), dtype=_np.float64)
+    # NOTE: the same criterion as `estimate`, so that the result
+    # for a set does not depend on it being in a batch
+    valid = _np.linalg.cond(G, 1) <= MAX_NORMAL_CONDITION  # (F,)
+    if valid.any():
+        out[valid] = _np.linalg.solve(G[valid], b[valid]).transpose(0, 2, 1)
+    for idx in _np.flatnonzero(~valid):
+        # degenerate sets
+        out[idx] = estimate(src[idx], dst[idx])
+    return out
 
 
 def to_square(compact: AffineMatrix) -> AffineSquare:
+    """returns `compact` itself if it is already a square matrix.
+    otherwise, a new 3x3 matrix is returned."""
     nrows, ncols = compact.shape
     if nrows == 3:
         return compact
     else:
-        return _np.vstack([compact, [0, 0, 1]], dtype=_np.float32)
+        square = _np.empty((3, 3), dtype=_np.float32)
+        square[:2] = compact
+        square[2] = (0, 0, 1)
+        return square
 
 
 def to_compact(square: AffineMatrix) -> AffineCompact:
@@ -84,15 +182,32 @@ def compose(*matrices: Tuple[AffineMatrix]) -> AffineCompact:
     """composes the affine transformations.
     ``compose(A, B, C)`` results in the transformation in the
     order ``A -> B -> C``"""
-    M = _np.eye(3)
     if len(matrices) == 0:
-        return M
-    elif len(matrices) == 1:
-        return to_compact(matrices[0])
-    else:
-        for A in matrices:
-            M = to_square(A) @ M
-        return to_compact(M)
+        return identity()
+    # NOTE: composing directly in the compact form,
+    # i.e. [B | b] . [A | a] = [BA | Ba + b], avoids building the squares
+    composed = _np.array(to_compact(matrices[0]), dtype=_np.float64)
+    for M in matrices[1:]:
+        M = to_compact(M)
+        composed[:, 2] = M[:, :2] @ composed[:, 2] + M[:, 2]
+        composed[:, :2] = M[:, :2] @ composed[:, :2]
+    return composed
+
+
+def rescale(
+    warp: AffineMatrix,
+    size: Tuple[int, int],
+    source_size: Optional[Tuple[int, int]] = None
+) -> AffineCompact:
+    """composes `warp` with the resizing of its output image from `source_size`
+    (defaults to `VIDEO_FRAME_SIZE`) to `size`, both given as (width, height).
+    follows the pixel-center convention of `cv2.resize`."""
+    if source_size is None:
+        source_size = _defaults.VIDEO_FRAME_SIZE
+    scale = _np.array(size, dtype=_np.float64) / _np.array(source_size, dtype=_np.float64)
+    scaled = _np.array(to_compact(warp), dtype=_np.float64) * scale[:, None]
+    scaled[:, 2] += (scale - 1) / 2
+    return scaled
 
 
 def warp_image(
@@ -106,13 +221,90 @@ def warp_image(
     return _cv2.warpAffine(img, to_compact(warp), dsize=size)
 
 
+def nonzero_bounds(img: _npt.NDArray) -> Optional[Tuple[int, int, int, int]]:
+    """returns the bounding box (x0, x1, y0, y1; inclusive) of
+    the non-zero pixels of `img`, or None if there are none."""
+    support = img if img.ndim == 2 else img.any(axis=2)
+    rows = _np.flatnonzero(support.any(axis=1))
+    if rows.size == 0:
+        return None
+    cols = _np.flatnonzero(support.any(axis=0))
+    return (int(cols[0]), int(cols[-1]), int(rows[0]), int(rows[-1]))
+
+
+def warp_sparse_image(
+    img: _npt.NDArray,
+    warp: AffineMatrix,
+    size: Optional[Tuple[int]] = None,
+    out: Optional[_npt.NDArray] = None,
+    bounds: Optional[Tuple[int, int, int, int]] = None,
+    interpolation: int = _cv2.INTER_LINEAR
+) -> _npt.NDArray:
+    """the same as `warp_image`, but only warps the region around the
+    non-zero pixels of `img`, and leaves the rest zero. suited for
+    mostly-empty images, e.g. ROI masks. nothing is warped in case
+    the region falls outside the output image.
+
+    if `out` (a zero-filled array) is given, the result is written into it,
+    and `size` is taken from its shape. `bounds` (as returned by
+    `nonzero_bounds`) can be given if it is already known.
+    `interpolation` is passed to `cv2.warpAffine` as its flags.
+
+    because of the fixed-point arithmetic of OpenCV, pixels at the
+    edges may differ from `warp_image` by one intensity level."""
+    if out is not None:
+        size = (out.shape[1], out.shape[0])
+    elif size is None:
+        size = _defaults.VIDEO_FRAME_SIZE
+    width, height = size
+    if out is None:
+        out = _np.zeros((height, width) + img.shape[2:], dtype=img.dtype)
+    if bounds is None:
+        bounds = nonzero_bounds(img)
+        if bounds is None:
+            return out
+
+    # the bounding box in the output, with margins for interpolation
+    x0, x1, y0, y1 = bounds[0] - 1, bounds[1] + 1, bounds[2] - 1, bounds[3] + 1
+    corners = warp_points(_np.array([[x0, y0], [x1, y0], [x0, y1], [x1, y1]], dtype=_np.float64), warp)
+    dx0 = max(int(_np.floor(corners[:, 0].min())) - 1, 0)
+    dy0 = max(int(_np.floor(corners[:, 1].min())) - 1, 0)
+    dx1 = min(int(_np.ceil(corners[:, 0].max())) + 2, width)
+    dy1 = min(int(_np.ceil(corners[:, 1].max())) + 2, height)
+    if (dx1 <= dx0) or (dy1 <= dy0):
+        return out
+    shifted = _np.array(to_compact(warp), dtype=_np.float64)
+    shifted[:, 2] -= (dx0, dy0)
+    out[dy0:dy1, dx0:dx1] = _cv2.warpAffine(img, shifted, dsize=(dx1 - dx0, dy1 - dy0), flags=interpolation)
+    return out
+
+
 def warp_points(
     pts: _npt.NDArray,
     warp: AffineMatrix,
+    out: Optional[_npt.NDArray] = None
 ) -> _npt.NDArray:
     """applies the warp matrix `warp` (shape (2, 3)) to the given set of 2-d points,
-    `pts`, in shape (num_points, 2)."""
+    `pts`, in shape (num_points, 2).
+
+    the results are written into `out` (shape (num_points, 2)) if it is given."""
     [N, K] = pts.shape
     assert K == 2
-    pts = _np.concatenate([pts, _np.ones((N, 1))], axis=1)
-    return (pts @ to_square(warp).T)[:, :2]
+    M = to_compact(warp)  # (2, 3)
+    if out is None:
+        out = _np.empty((N, 2), dtype=_np.result_type(pts.dtype, M.dtype, _np.float32))
+    if _libwrapper.HAS_NUMBA:
+        _warp_points_kernel(pts, M, out)
+    else:
+        _np.matmul(pts, M[:, :2].T, out=out)
+        out += M[:, 2]
+    return out
+
+
+@_libwrapper.njit(cache=True, fastmath=True)
+def _warp_points_kernel(pts, M, out):
+    for i in range(pts.shape[0]):
+        px = pts[i, 0]
+        py = pts[i, 1]
+        out[i, 0] = M[0, 0] * px + M[0, 1] * py + M[0, 2]
+        out[i, 1] = M[1, 0] * px + M[1, 1] * py + M[1, 2]
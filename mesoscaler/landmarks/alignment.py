@@ -20,10 +20,11 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 
-from typing import Union, Optional, Iterable, Tuple, Generator
+from typing import Union, Optional, Iterable, Tuple, Dict, List, Generator
 import dataclasses as _dataclasses
 import math as _math
 
+import numpy as _np
 import numpy.typing as _npt
 
 from ..typing import (
@@ -101,7 +102,7 @@ def align_dlc_landmarks(
     If `reference` is not supplied, `load_reference_landmarks` will be used to
     obtain the reference landmarks.
 
-    Internally uses `validate_landmarks` and `estimate_warp_matrix`.
+    Internally uses `validate_landmarks` and `estimate_warp_matrices`.
     """
     if isinstance(target, _base.DLCOutput):
         target = _base.landmarks_from_dlc_output(target)
@@ -111,16 +112,16 @@ def align_dlc_landmarks(
         target = tuple(target)
     if reference is None:
         reference = _base.load_reference_landmarks()
-    return tuple(
-        estimate_warp_matrix(
+    return estimate_warp_matrices(
+        tuple(
             validate_landmarks(
                 single,
                 reference,
                 likelihood_threshold=likelihood_threshold,
                 min_valid_points=min_valid_points
-            ),
-            separate_sides=separate_sides
-        ) for single in target
+            ) for single in target
+        ),
+        separate_sides=separate_sides
     )
 
 
@@ -140,17 +141,16 @@ def validate_landmarks(
         likelihood_threshold = _defaults.LANDMARK_LIKELIHOOD_THRESHOLD
     if min_valid_points is None:
         min_valid_points = _defaults.MIN_VALID_POINTS_ALIGNED
-    valid_targets = []
-    valid_refs = []
-    for tg, ref in zip(target, reference):
-        if tg.p > likelihood_threshold:
-            valid_targets.append(tg)
-            valid_refs.append(ref)
-    if len(valid_targets) < min_valid_points:
-        raise ValueError(f"{len(valid_targets)}/{len(target)} points above threshold={likelihood_threshold:.4f} (at least {min_valid_points} needed)")
+    num = min(len(target), len(reference))
+    # NOTE: the threshold is rounded to the dtype of the likelihoods (i.e. `LANDMARK_DTYPE`
+    # for DLC outputs), so that a likelihood equal to the threshold stays equal to it
+    p = target.p[:num]
+    valid = _np.flatnonzero(p > _np.asarray(likelihood_threshold, dtype=p.dtype))
+    if valid.size < min_valid_points:
+        raise ValueError(f"{valid.size}/{len(target)} points above threshold={likelihood_threshold:.4f} (at least {min_valid_points} needed)")
     return Pairing(
-        target=_base.Landmarks.from_single_landmarks(valid_targets),
-        reference=_base.Landmarks.from_single_landmarks(valid_refs)
+        target=target[valid],
+        reference=reference[valid]
     )
 
 
@@ -164,34 +164,61 @@ def estimate_warp_matrix(
     The paired landmarks are assumed to have been 'validated' by the user,
     e.g. by means of `validate_landmarks`.
 
-    Internally uses the `estimate_affine` function.
+    Internally uses `estimate_warp_matrices`.
     """
-    def _align(pair: Pairing) -> _npt.NDArray:
-        return _affine.estimate(
-            pair.reference.xy,
-            pair.target.xy
-        )
+    return estimate_warp_matrices((validated_pair,), separate_sides=separate_sides)[0]
 
-    left: Pairing = validated_pair.left
-    right: Pairing = validated_pair.right
 
-    if separate_sides is None:
-        separate_sides = (len(left.without_middle) > 2) and (len(right.without_middle) > 2)
+def estimate_warp_matrices(
+    validated_pairs: Iterable[Pairing],
+    separate_sides: Optional[bool] = None
+) -> Tuple[_base.Alignment]:
+    """the batch version of `estimate_warp_matrix`.
 
-    if separate_sides is True:
-        return _base.Alignment(
-            left=_align(left),
-            right=_align(right),
-            separate=True
-        )
-    else:
-        warp = _align(validated_pair)
-        return _base.Alignment(
-            left=warp,
-            right=warp,
-            separate=False
+    The pairs that share the same set of valid landmarks are
+    solved at once using `affine.estimate_batch`.
+    """
+    validated_pairs = tuple(validated_pairs)
+    groups: Dict[Tuple[str], List[int]] = dict()
+    for idx, pair in enumerate(validated_pairs):
+        groups.setdefault(pair.names, []).append(idx)
+
+    def _align(pairs: Iterable[Pairing]) -> _npt.NDArray:
+        return _affine.estimate_batch(
+            _np.stack([pair.reference.xy for pair in pairs]),
+            _np.stack([pair.target.xy for pair in pairs])
         )
 
+    aligned: List[Optional[_base.Alignment]] = [None] * len(validated_pairs)
+    for indices in groups.values():
+        group = tuple(validated_pairs[idx] for idx in indices)
+        left  = tuple(pair.left for pair in group)
+        right = tuple(pair.right for pair in group)
+
+        separate = separate_sides
+        if separate is None:
+            # NOTE: the same for all the pairs in the group
+            separate = (len(left[0].without_middle) > 2) and (len(right[0].without_middle) > 2)
+
+        if separate is True:
+            lefts  = _align(left)
+            rights = _align(right)
+            for i, idx in enumerate(indices):
+                aligned[idx] = _base.Alignment(
+                    left=lefts[i],
+                    right=rights[i],
+                    separate=True
+                )
+        else:
+            warps = _align(group)
+            for i, idx in enumerate(indices):
+                aligned[idx] = _base.Alignment(
+                    left=warps[i],
+                    right=warps[i],
+                    separate=False
+                )
+    return tuple(aligned)
+
 
 def update_dlc_landmarks(
     orig: _base.DLCOutput,
@@ -207,9 +234,7 @@ def update_dlc_landmarks(
     if reference is None:
         reference = _base.load_reference_landmarks()
     if alignment is not None:
-        landmarks = [
-            align.warp_points(reference) for align in alignment
-        ]
+        landmarks = _base.warp_all_frames(alignment, reference)
     else:
         landmarks = [reference] * orig.size
 
@@ -218,20 +243,29 @@ def update_dlc_landmarks(
     scorer    = newtable.columns[0][0]
     pointIDs = set(col[1] for col in newtable.columns)
 
+    # NOTE: all the frames share the landmark names of `reference`
+    num_frames = min(len(landmarks), newtable.shape[0])
+    names = landmarks[0].names if num_frames > 0 else ()
+    if isinstance(landmarks, _base.LandmarkSeries):
+        coords = landmarks.coords[:num_frames]
+    else:
+        coords = _np.stack([marks.coords for marks in landmarks[:num_frames]], axis=0) if num_frames > 0 else None
     for pointID in pointIDs:
         pointname = _refs.LANDMARK_NAMES[pointID.upper()]
-        for rowidx, marks in enumerate(landmarks):
-            if pointname in marks.names:
-                mark = marks[pointname]
-                newtable.loc[rowidx, (scorer, pointID, 'x')] = mark.x
-                newtable.loc[rowidx, (scorer, pointID, 'y')] = mark.y
-            else:
-                newtable.loc[rowidx, (scorer, pointID, 'x')] = _math.nan
-                newtable.loc[rowidx, (scorer, pointID, 'y')] = _math.nan
+        xs = _np.full(newtable.shape[0], _math.nan)
+        ys = _np.full(newtable.shape[0], _math.nan)
+        if pointname in names:
+            idx = names.index(pointname)
+            xs[:num_frames] = coords[:, idx, 0]
+            ys[:num_frames] = coords[:, idx, 1]
+        newtable[(scorer, pointID, 'x')] = xs
+        newtable[(scorer, pointID, 'y')] = ys
 
     # update images
     images = orig.images
-    if images is not None:
+    if isinstance(images, _base.LazyVideo):
+        images = images.with_annotations(landmarks)
+    elif images is not None:
         images = images.copy()
         for i, marks in enumerate(landmarks):
             images[i] = marks.annotate_image(images[i])
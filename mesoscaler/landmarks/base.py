@@ -23,20 +23,20 @@
 # flake8: noqa: E712
 
 from pathlib import Path
-from typing import Optional, Union, Tuple, Iterable, Dict, Any
+from typing import Optional, Union, Tuple, Iterable, Iterator, Sequence, Dict, Any
 from typing_extensions import Self
 import dataclasses as _dataclasses
+import functools as _functools
+import itertools as _itertools
 import json as _json
+import csv as _csv
+import collections as _collections
+import threading as _threading
 
 import numpy as _np
 import numpy.typing as _npt
 import pandas as _pd
 import cv2 as _cv2
-import imageio.v3 as _iio
-from PIL import (
-    Image as _PILImage,
-    ImageDraw as _PILDraw,
-)
 
 from ..typing import (
     PathLike,
@@ -48,6 +48,8 @@ from ..libwrapper import (
 )
 from .. import (
     defaults as _defaults,
+    fileutils as _fileutils,
+    libwrapper as _libwrapper,
 )
 from . import (
     reference as _refs,
@@ -55,10 +57,196 @@ from . import (
     affine as _affine,
 )
 
+# the names and the (x, y, likelihood) coordinates of the reference landmarks
+# (in the 512 x 512 space), in the order of `LANDMARK_IDS`
+_REF_NAMES  = tuple(_refs.LANDMARK_NAMES[i] for i in _refs.LANDMARK_IDS)
+_REF_COORDS = _np.array(
+    [_refs.LANDMARK_COORDS_512[i] + (1,) for i in _refs.LANDMARK_IDS],
+    dtype=_np.float64
+)  # (1,) is added to coords to represent `likelihood = 1.0`
+_REF_COORDS.setflags(write=False)
+
+# the column names for the warp matrices in the alignment table, in the row-major order
+_ALIGNMENT_KEYS = dict(
+    (side, tuple(f"{side}_{row}{col}" for row in ('x', 'y') for col in ('x', 'y', 'c')))
+    for side in ('left', 'right')
+)
+
+# the dtype used to hold the landmark coordinates (and likelihoods) of DLC outputs.
+# NOTE: rounding the inputs to single precision does change the estimated warps,
+# but only by ~1e-3 px at most within the 512 x 512 frames (i.e. well below sub-pixel);
+# `validate_landmarks` rounds the likelihood threshold in the same way
+LANDMARK_DTYPE = _np.float32
+
+# the RGB colors of the landmarks (by name) used to annotate the predicted landmarks:
+# evenly spaced hues, from red to violet, in the order of `LANDMARK_IDS`
+# (similarly to the default 'rainbow' colormap of DeepLabCut)
+LANDMARK_COLORS: Dict[str, Tuple[int, int, int]] = dict(zip(
+    _REF_NAMES,
+    (tuple(color) for color in _cv2.cvtColor(
+        _np.array([[(hue, 255, 255) for hue in _np.linspace(0, 150, len(_REF_NAMES))]], dtype=_np.uint8),
+        _cv2.COLOR_HSV2RGB
+    )[0].tolist())
+))
+
+# the number of recently decoded frames kept by `LazyVideo`
+MAX_CACHED_FRAMES = 8
+
+
+class LazyVideo:
+    """a read-only sequence of the (RGB) frames of a video file,
+    which are only decoded when they are accessed.
+
+    frames that are skipped over are only grabbed (i.e. not decoded).
+    the frames returned by indexing are cached, and hence read-only.
+    if ``annotations`` (a sequence of `Landmarks`, one per frame) is given,
+    each frame is returned with the landmarks drawn onto it
+    (using `Landmarks.annotate_image` with ``likelihood_threshold`` and ``colors``).
+
+    use ``numpy.asarray()`` to load all the frames at once."""
+
+    def __init__(
+        self,
+        path: PathLike,
+        annotations: Optional[Sequence['Landmarks']] = None,
+        likelihood_threshold: Optional[Number] = None,
+        colors: Optional[Dict[str, Tuple[int, int, int]]] = None
+    ):
+        self.path = Path(path)
+        if not self.path.is_file():
+            raise FileNotFoundError(f"video file not found: {self.path}")
+        self.annotations = annotations
+        self.likelihood_threshold = likelihood_threshold
+        self.colors = colors
+        self._lock = _threading.Lock()
+        self._cache = _collections.OrderedDict()
+        # NOTE: the capture for random access is only opened on the first indexing,
+        # as many instances are only iterated over (using their own captures)
+        self._capture = None
+        self._position = 0  # the index of the next frame to be grabbed
+        self._shape = None  # (length, height, width), probed on demand
+
+    def _new_capture(self) -> _cv2.VideoCapture:
+        capture = _cv2.VideoCapture(str(self.path))
+        if not capture.isOpened():
+            capture.release()
+            raise RuntimeError(f"failed to open the video file: {self.path}")
+        return capture
+
+    def _open(self):
+        if self._capture is not None:
+            self._capture.release()
+        self._capture = self._new_capture()
+        self._position = 0
+
+    def _probe(self) -> Tuple[int, int, int]:
+        if self._shape is None:
+            capture = self._new_capture()
+            try:
+                self._shape = (
+                    int(capture.get(_cv2.CAP_PROP_FRAME_COUNT)),
+                    int(capture.get(_cv2.CAP_PROP_FRAME_HEIGHT)),
+                    int(capture.get(_cv2.CAP_PROP_FRAME_WIDTH)),
+                )
+            finally:
+                capture.release()
+        return self._shape
+
+    def _grab(self) -> bool:
+        if not self._capture.grab():
+            return False
+        self._position += 1
+        return True
+
+    def _retrieve(self, idx: int) -> _npt.NDArray:
+        ok, frame = self._capture.retrieve()
+        if not ok:
+            raise IOError(f"failed to decode frame #{idx} of: {self.path}")
+        return self._annotate(idx, _cv2.cvtColor(frame, _cv2.COLOR_BGR2RGB))
+
+    def _annotate(self, idx: int, frame: _npt.NDArray) -> _npt.NDArray:
+        if self.annotations is None:
+            return frame
+        return self.annotations[idx].annotate_image(
+            frame,
+            likelihood_threshold=self.likelihood_threshold,
+            colors=self.colors
+        )
+
+    def __len__(self):
+        return self._probe()[0]
+
+    @property
+    def shape(self) -> Tuple[int, int, int, int]:
+        return self._probe() + (3,)
+
+    def __getitem__(self, idx: int) -> _npt.NDArray:
+        idx = int(idx)
+        length = len(self)
+        if idx < 0:
+            idx += length
+        if (idx < 0) or (idx >= length):
+            raise IndexError(f"frame index out of range: {idx}")
+        with self._lock:
+            if idx in self._cache:
+                self._cache.move_to_end(idx)
+                return self._cache[idx]
+            if (self._capture is None) or (idx < self._position):
+                # (re-)open to rewind
+                self._open()
+            while self._position <= idx:
+                if not self._grab():
+                    raise IndexError(f"frame #{idx} not found in: {self.path}")
+            frame = self._retrieve(idx)
+            # NOTE: the cached frame is shared between the callers
+            frame.flags.writeable = False
+            self._cache[idx] = frame
+            if len(self._cache) > MAX_CACHED_FRAMES:
+                self._cache.popitem(last=False)
+            return frame
+
+    def __iter__(self) -> Iterator[_npt.NDArray]:
+        return self.iter_frames()
+
+    def iter_frames(self, step: int = 1) -> Iterator[_npt.NDArray]:
+        """iterates over every ``step``-th frame, using a capture
+        independent of the one used for random access."""
+        capture = self._new_capture()
+        try:
+            idx = 0
+            while capture.grab():
+                if idx % step == 0:
+                    ok, frame = capture.retrieve()
+                    if not ok:
+                        raise IOError(f"failed to decode frame #{idx} of: {self.path}")
+                    yield self._annotate(idx, _cv2.cvtColor(frame, _cv2.COLOR_BGR2RGB))
+                idx += 1
+        finally:
+            capture.release()
+
+    def __array__(self, dtype=None, copy=None) -> _npt.NDArray:
+        frames = _np.stack(list(self.iter_frames()), axis=0)
+        return frames if dtype is None else frames.astype(dtype)
+
+    def with_annotations(self, annotations: Sequence['Landmarks']) -> 'LazyVideo':
+        """returns another `LazyVideo` of the same file, which draws ``annotations``
+        (all the valid ones, in white)."""
+        video = self.__class__(self.path, annotations=annotations)
+        video._shape = self._shape
+        return video
+
+    def close(self):
+        with self._lock:
+            if self._capture is not None:
+                self._capture.release()
+                self._capture = None
+            self._cache.clear()
+
+
 @_dataclasses.dataclass
 class DLCOutput:
     table: _pd.DataFrame
-    images: _npt.NDArray
+    images: Union[_npt.NDArray, LazyVideo, None]
 
     @property
     def size(self) -> int:
@@ -77,14 +265,39 @@ class DLCOutput:
             raise FileNotFoundError('CSV file not found: ' + str(tabpath))
         elif (load_images == True) and (not imgpath.exists()):
             raise FileNotFoundError('video file not found: ' + str(imgpath))
-        table = _pd.read_csv(tabpath, header=[0, 1, 2])
+        table = read_dlc_table(tabpath)
         if load_images == True:
-            images = _iio.imread(str(imgpath))
+            images = LazyVideo(imgpath)
         else:
             images = None
         return cls(table=table, images=images)
 
 
+def read_dlc_table(path: PathLike) -> _pd.DataFrame:
+    """reads the DLC output CSV file, with its 3-level column header
+    (scorer, bodyparts, coords).
+
+    uses the multi-threaded CSV parser of `pyarrow` if it is available,
+    and falls back to `pandas.read_csv` otherwise."""
+    path = str(path)
+    if not _libwrapper.HAS_PYARROW:
+        return _pd.read_csv(path, header=[0, 1, 2])
+    with open(path, 'r', newline='') as src:
+        header = list(_itertools.islice(_csv.reader(src), 3))
+    if (len(header) < 3) or any(len(row) != len(header[0]) for row in header):
+        # leave the unusual headers to pandas
+        return _pd.read_csv(path, header=[0, 1, 2])
+    arrow_csv = _libwrapper.pyarrow_csv
+    data = arrow_csv.read_csv(
+        path,
+        read_options=arrow_csv.ReadOptions(skip_rows=3, autogenerate_column_names=True),
+    ).to_pandas()
+    data.columns = _pd.MultiIndex.from_arrays(
+        [list(row) for row in header], names=[None, None, None]
+    )
+    return data
+
+
 @_dataclasses.dataclass
 class Landmark:
     name: str
@@ -103,7 +316,8 @@ class Landmark:
         return self.coords[2]
     
     def is_valid(self) -> bool:
-        return all(x for x in ~_np.isnan(self.coords.ravel()[:2]))
+        """returns True if both x and y are finite."""
+        return bool(_np.isfinite(self.coords.ravel()[:2]).all())
     
     def to_dict(self) -> Dict[str, Any]:
         return {
@@ -135,6 +349,12 @@ class Landmarks:
     def xy(self) -> _npt.NDArray:
         """returns the x/y coordinates as a numpy array."""
         return self.coords[:, :2]
+
+    @property
+    def valid_mask(self) -> _npt.NDArray:
+        """returns the boolean mask of the landmarks with finite x/y coordinates
+        (the vectorized version of `Landmark.is_valid`)."""
+        return _np.isfinite(self.xy).all(axis=1)
     
     def __len__(self):
         return len(self.names)
@@ -165,30 +385,35 @@ class Landmarks:
             )
         elif isinstance(key, slice):
             return self.__class__(
-                name=self.names[key],
+                names=self.names[key],
                 coords=self.coords[key, :]
             )
         else:
-            # assumes npt.NDArray
-            raise NotImplementedError(f'TODO: Landmarks.__getitem__({key.__class__.__name__})')
+            # assumes npt.NDArray (either a boolean mask or integer indices)
+            key = _np.asarray(key)
+            if key.dtype == bool:
+                key = _np.flatnonzero(key)
+            elif key.size == 0:
+                key = key.astype(_np.intp)  # e.g. an empty list
+            return self.__class__(
+                names=tuple(self.names[idx] for idx in key),
+                coords=self.coords[key, :]
+            )
 
     def ordered(self, keys: Iterable[str]) -> Self:
         """re-order the landmarks in accordance with the series of landmark names
         specified as ``keys``."""
-        landmarks = [self[key] for key in keys if key in self.names]
-        if len(landmarks) == 0:
-            return self.__class__(names=(), coords=_np.array([]))
-        else:
-            return self.__class__(
-                names=tuple(item.name for item in landmarks),
-                coords=_np.stack([item.coords for item in landmarks], axis=0)
-            )
+        names, idx = _ordered_indices(self.names, tuple(keys))
+        return self.__class__(
+            names=names,
+            coords=self.coords[idx]  # (0, 3) if none of the keys are found
+        )
 
     def affine_warp(self, warp: _npt.NDArray) -> Self:
         if len(self) == 0:
             return self
-        coords = self.coords.copy()
-        coords[:, :2] = _affine.warp_points(self.coords[:, :2], warp)
+        coords = self.coords.astype(_np.result_type(self.coords.dtype, _np.float32))  # copied
+        _affine.warp_points(self.coords[:, :2], warp, out=coords[:, :2])
         return self.__class__(
             names=self.names,
             coords=coords
@@ -197,20 +422,28 @@ class Landmarks:
     def annotate_image(
         self,
         image: _npt.NDArray,
-        markersize: int = 16
+        markersize: int = 16,
+        likelihood_threshold: Optional[Number] = None,
+        colors: Optional[Dict[str, Tuple[int, int, int]]] = None
     ) -> _npt.NDArray:
-        buf  = _PILImage.fromarray(image)
-        draw = _PILDraw.Draw(buf)
-        rad  = markersize / 2
-        for pt in self.points:
-            if not pt.is_valid():
-                continue
-            draw.ellipse(
-                [(round(pt.x - rad), round(pt.y - rad)),
-                 (round(pt.x + rad), round(pt.y + rad))],
-                 fill=(255, 255, 255)  # white
-            )
-        return _np.asarray(buf)
+        """draws the valid landmarks onto a copy of (RGB) `image`.
+
+        if `likelihood_threshold` is given, only the landmarks with likelihoods
+        above it are drawn. `colors` maps the landmark names to their colors
+        (e.g. `LANDMARK_COLORS`); the landmarks not found there are drawn in white."""
+        out = _np.array(image, order='C')  # draw on a copy
+        rad = int(round(markersize / 2))
+        mask = self.valid_mask
+        if likelihood_threshold is not None:
+            # NOTE: the same comparison as `validate_landmarks`
+            mask &= (self.p > _np.asarray(likelihood_threshold, dtype=self.p.dtype))
+        if colors is None:
+            colors = {}
+        indices = _np.flatnonzero(mask)
+        for i, (x, y) in zip(indices, _np.rint(self.xy[indices]).astype(_np.int_)):
+            color = colors.get(self.names[i], (255, 255, 255))  # white by default
+            _cv2.circle(out, (int(x), int(y)), rad, color, thickness=-1)
+        return out
 
     @property
     def points(self) -> Tuple[Landmark]:
@@ -237,6 +470,9 @@ class Landmarks:
     
     @classmethod
     def from_single_landmarks(cls, landmarks: Iterable[Landmark]) -> Self:
+        landmarks = tuple(landmarks)
+        if len(landmarks) == 0:
+            return cls(names=(), coords=_np.empty((0, 3)))
         return cls(
             names=tuple(item.name for item in landmarks),
             coords=_np.stack([item.coords for item in landmarks], axis=0)
@@ -271,6 +507,39 @@ class Landmarks:
         return entry
 
 
+@_dataclasses.dataclass
+class LandmarkSeries:
+    """the landmarks of a series of frames sharing the same names,
+    backed by a single (num_frames, num_landmarks, 3) array.
+
+    behaves as a sequence of `Landmarks`, each of which
+    being a view of the corresponding frame."""
+    names: Tuple[str]
+    coords: _npt.NDArray
+
+    def __len__(self):
+        return self.coords.shape[0]
+
+    def __getitem__(self, idx: Union[int, slice]) -> Union[Landmarks, Self]:
+        if isinstance(idx, slice):
+            return self.__class__(names=self.names, coords=self.coords[idx])
+        return Landmarks(names=self.names, coords=self.coords[idx])
+
+    def __iter__(self) -> Iterator[Landmarks]:
+        for frame in self.coords:
+            yield Landmarks(names=self.names, coords=frame)
+
+    def affine_warp(self, warps: _npt.NDArray) -> Self:
+        """warps the landmarks of all the frames at once, using
+        the (num_frames, 2, 3) warp matrices (or a single (2, 3) matrix)."""
+        warps  = _np.asarray(warps)
+        coords = self.coords.astype(_np.result_type(self.coords.dtype, _np.float32))  # copied
+        if warps.ndim == 2:
+            warps = warps[None]
+        coords[..., :2] = _np.einsum('tij,tnj->tni', warps[..., :2], self.coords[..., :2]) + warps[:, None, :, 2]
+        return self.__class__(names=self.names, coords=coords)
+
+
 @_dataclasses.dataclass
 class Alignment:
     """holds the warp matrices for the left and the right hemispheres.
@@ -283,6 +552,25 @@ class Alignment:
     # indication of whether the left and
     # the right hemispheres were estimated separately
 
+    _squares: Dict[str, _npt.NDArray] = _dataclasses.field(
+        default_factory=dict, init=False, repr=False, compare=False
+    )  # cache of the matrices derived from `left` and `right`
+
+    def affine(self, side: Hemisphere = 'left') -> _affine.AffineSquare:
+        """returns the warp matrix for `side` in the 3x3 form.
+        the matrix is computed once and reused afterwards."""
+        if side not in self._squares:
+            self._squares[side] = _affine.to_square(getattr(self, side))
+        return self._squares[side]
+
+    def inverse_affine(self, side: Hemisphere = 'left') -> _affine.AffineSquare:
+        """returns the inverse of the warp matrix for `side` in the 3x3 form.
+        the matrix is computed once and reused afterwards."""
+        key = f"{side}_inverse"
+        if key not in self._squares:
+            self._squares[key] = _np.linalg.inv(self.affine(side))
+        return self._squares[key]
+
     def invert(self) -> Self:
         """returns the inverse warp matrices.
         currently, this method is only supported for Alignment objects
@@ -298,37 +586,66 @@ class Alignment:
         )
 
     def warp_points(self, landmarks: Landmarks) -> Landmarks:
-        left: Landmarks   = landmarks.left.without_middle
-        middle: Landmarks = landmarks.middle
-        right: Landmarks  = landmarks.right.without_middle
-
-        left  = left.affine_warp(self.left)
-        right = right.affine_warp(self.right)
-        if self.separate is True:
-            mleft  = middle.affine_warp(self.left)
-            mright = middle.affine_warp(self.right)
-
-            # NOTE: this is a temporary solution
-            middle = Landmarks(
-                names=middle.names,
-                coords=(mleft.coords + mright.coords) / 2
-            )
-        else:
-            middle = middle.affine_warp(self.left)
-        return Landmarks.from_single_landmarks(
-            left.points + middle.points + right.points
-        )
-    
+        """warps the landmarks (re-ordered as left, middle and right)
+        using the warp matrix of the corresponding side. if the sides
+        were estimated separately, the middle landmarks are warped by
+        the average of the two sides."""
+        names, coords = _warp_frames((self,), landmarks.names, landmarks.coords[None])
+        return Landmarks(names=names, coords=coords[0])
+
+    def _sided_warps(self) -> _npt.NDArray:
+        """returns the warp matrices for the left, the middle and the right
+        landmarks, in shape (3, 2, 3)."""
+        if 'sided' not in self._squares:
+            if self.separate is True:
+                # NOTE: this is a temporary solution
+                # (warping by the averaged matrix is the same as averaging the warped points)
+                middle = (_np.asarray(self.left) + _np.asarray(self.right)) / 2
+            else:
+                middle = self.left
+            self._squares['sided'] = _np.stack([self.left, middle, self.right], axis=0)
+        return self._squares['sided']
+
+    def warp_matrix(
+        self,
+        side: Hemisphere = 'left',
+        size: Optional[Tuple[int, int]] = None
+    ) -> _affine.AffineCompact:
+        """returns the (2, 3) warp matrix for `side`, as a contiguous float64
+        array that can be passed to OpenCV as it is. if `size` (width, height)
+        is given, the matrix includes the resizing of the output image to it.
+        the matrix is computed once and reused afterwards."""
+        if size is None:
+            size = _defaults.VIDEO_FRAME_SIZE
+        width, height = size
+        key = f"{side}_warp_{width}x{height}"
+        if key not in self._squares:
+            if (width, height) == tuple(_defaults.VIDEO_FRAME_SIZE):
+                warp = _affine.to_compact(getattr(self, side))
+            else:
+                warp = _affine.rescale(getattr(self, side), (width, height))
+            self._squares[key] = _np.ascontiguousarray(warp, dtype=_np.float64)
+        return self._squares[key]
+
     def warp_image(
         self,
         image: _npt.NDArray,
-        side: Optional[Hemisphere] = 'left'
+        side: Optional[Hemisphere] = 'left',
+        sparse: bool = False,
+        size: Optional[Tuple[int, int]] = None
     ) -> _npt.NDArray:
-        return _cv2.warpAffine(
-            image,
-            getattr(self, side),
-            dsize=_defaults.VIDEO_FRAME_SIZE
-        )
+        """warps `image` using the warp matrix for `side`.
+        set `sparse` to True for mostly-empty images (e.g. ROI masks)
+        to only process around their non-zero pixels.
+
+        if `size` (width, height) is given, the output image is resized
+        to it as a part of the warp (instead of being resized afterwards)."""
+        if size is None:
+            size = _defaults.VIDEO_FRAME_SIZE
+        warp = self.warp_matrix(side, size=size)
+        if sparse:
+            return _affine.warp_sparse_image(image, warp, size=size)
+        return _cv2.warpAffine(image, warp, dsize=tuple(size))
     
     def to_hdf(
         self,
@@ -365,11 +682,10 @@ class Alignment:
     @classmethod
     def from_dict(cls, dct) -> Self:
         def reconstruct_(dct, side: str) -> _npt.NDArray:
-            ret = _np.zeros((2, 3), dtype=_np.float32)
-            for i, row in enumerate(('x', 'y')):
-                for j, col in enumerate(('x', 'y', 'c')):
-                    ret[i, j] = dct[f'{side}_{row}{col}']
-            return ret
+            return _np.array(
+                [dct[key] for key in _ALIGNMENT_KEYS[side]],
+                dtype=_np.float32
+            ).reshape((2, 3))
 
         separate = dct['is_separate']
         left     = reconstruct_(dct, 'left')
@@ -377,17 +693,111 @@ class Alignment:
         return Alignment(left=left, right=right, separate=separate)
 
 
+def warp_all_frames(
+    alignment: Sequence[Alignment],
+    landmarks: Union[Landmarks, Sequence[Landmarks]]
+) -> Union[LandmarkSeries, Tuple[Landmarks]]:
+    """warps the landmarks of each frame using the corresponding `Alignment`
+    (see `Alignment.warp_points`). if a single `Landmarks` object is given
+    (e.g. the reference), it is used for all the frames.
+
+    if all the frames share the same landmark names, they are warped
+    all at once, and the result is returned as a `LandmarkSeries`."""
+    alignment = tuple(alignment)
+    if isinstance(landmarks, Landmarks):
+        names  = landmarks.names
+        coords = _np.broadcast_to(landmarks.coords, (len(alignment),) + landmarks.coords.shape)
+    elif isinstance(landmarks, LandmarkSeries):
+        names  = landmarks.names
+        coords = landmarks.coords
+    else:
+        landmarks = tuple(landmarks)
+        if any(marks.names != landmarks[0].names for marks in landmarks[1:]):
+            if len(alignment) != len(landmarks):
+                raise ValueError(f"the number of alignments ({len(alignment)}) does not match the number of landmarks ({len(landmarks)})")
+            return tuple(align.warp_points(marks) for align, marks in zip(alignment, landmarks))
+        names  = landmarks[0].names if len(landmarks) > 0 else ()
+        coords = _np.stack([marks.coords for marks in landmarks], axis=0) if len(landmarks) > 0 else _np.empty((0, 0, 3))
+    if len(alignment) != coords.shape[0]:
+        raise ValueError(f"the number of alignments ({len(alignment)}) does not match the number of landmarks ({coords.shape[0]})")
+    if len(alignment) == 0:
+        return LandmarkSeries(names=(), coords=_np.empty((0, 0, 3)))
+    names, coords = _warp_frames(alignment, names, coords)
+    return LandmarkSeries(names=names, coords=coords)
+
+
+def _warp_frames(
+    alignment: Sequence[Alignment],
+    names: Tuple[str],
+    coords: _npt.NDArray
+) -> Tuple[Tuple[str], _npt.NDArray]:
+    """warps the (F, K, 3) coordinates of the F frames (sharing `names`)
+    using the F alignments. returns the re-ordered names and coordinates."""
+    names, order, sides = _sided_order(names)
+    coords = coords[:, order].astype(
+        _np.result_type(coords.dtype, _np.float32)
+    )  # copied; integer coordinates (e.g. the reference) are promoted
+    warps = _np.stack([align._sided_warps() for align in alignment], axis=0)[:, sides]  # (F, N, 2, 3)
+    coords[..., :2] = _np.einsum('fnij,fnj->fni', warps[..., :2], coords[..., :2]) + warps[..., 2]
+    return names, coords
+
+
+@_functools.lru_cache(maxsize=64)
+def _ordered_indices(
+    names: Tuple[str],
+    keys: Tuple[str]
+) -> Tuple[Tuple[str], _npt.NDArray]:
+    """returns the `keys` found in `names`, and their indices into `names`."""
+    lookup = {name: i for i, name in enumerate(names)}
+    found  = tuple(key for key in keys if key in lookup)
+    return found, _np.array([lookup[key] for key in found], dtype=_np.intp)
+
+
+@_functools.lru_cache(maxsize=16)
+def _sided_order(
+    names: Tuple[str]
+) -> Tuple[Tuple[str], _npt.NDArray, _npt.NDArray, _npt.NDArray]:
+    """returns the landmark names re-ordered as left, middle and right,
+    the corresponding indices into `names`, and the sides of the landmarks
+    in the new order (0: left, 1: middle, 2: right)."""
+    groups = (_refs.LEFT_LANDMARK_NAMES, _refs.MIDDLE_LANDMARK_NAMES, _refs.RIGHT_LANDMARK_NAMES)
+    ordered = [(name, side) for side, group in enumerate(groups) for name in group if name in names]
+    return (
+        tuple(name for name, _ in ordered),
+        _np.array([names.index(name) for name, _ in ordered], dtype=_np.int_),
+        _np.array([side for _, side in ordered], dtype=_np.int_),
+    )
+
+
 def write_labeled_video(
     outpath: PathLike,
     dlc_output: DLCOutput,
     fps: Optional[Number] = None
 ):
+    """writes the (RGB) frames of ``dlc_output.images`` out as a video file.
+    the frames are streamed to `cv2.VideoWriter` one at a time, so that
+    a `LazyVideo` is never loaded as a whole."""
     outpath = Path(outpath)
     if fps is None:
         fps = _defaults.VIDEO_FRAME_RATE
     if not outpath.parent.exists():
         outpath.parent.mkdir(parents=True)
-    _iio.imwrite(str(outpath), dlc_output.images, fps=fps)
+    writer = None
+    try:
+        for frame in dlc_output.images:
+            if writer is None:
+                writer = _cv2.VideoWriter(
+                    str(outpath),
+                    _cv2.VideoWriter_fourcc(*_defaults.VIDEO_FOURCC),
+                    fps,
+                    (frame.shape[1], frame.shape[0])
+                )
+                if not writer.isOpened():
+                    raise RuntimeError(f"failed to open the video file for writing: {outpath}")
+            writer.write(_cv2.cvtColor(_np.ascontiguousarray(frame), _cv2.COLOR_RGB2BGR))
+    finally:
+        if writer is not None:
+            writer.release()
 
 
 def write_dlc_landmarks(
@@ -400,35 +810,38 @@ def write_dlc_landmarks(
     dlc_output.table.to_csv(str(outpath), index=False, header=True)
     
 
+@_functools.lru_cache(maxsize=1)
 def load_reference_landmarks() -> Landmarks:
-    return Landmarks(
-        names=tuple(_refs.LANDMARK_NAMES[i] for i in _refs.LANDMARK_IDS),
-        coords=_np.array([_refs.LANDMARK_COORDS_512[item] + (1,) for item in _refs.LANDMARK_IDS])
-    )  # (1,) is added to coords to represent `likelihood = 1.0`
+    """returns the reference landmarks (in the 512 x 512 space).
+    the same object is returned on every call, so it must not be modified."""
+    return Landmarks(names=_REF_NAMES, coords=_REF_COORDS)
 
 
 def landmarks_from_dlc_output(
     output: Union[DLCOutput, _pd.DataFrame]
-) -> Tuple[Landmarks]:
+) -> LandmarkSeries:
     if isinstance(output, DLCOutput):
         tab = output.table
     else:
         tab = output
-    tab = tab.copy()
-    tab.columns = tab.columns.droplevel()  # drops level 0 (i.e. scorer)
-
-    frames = []
-    for rowidx in range(tab.shape[0]):
-        row = tab.iloc[rowidx].to_dict()
-        coords = []
-        for name in _refs.LANDMARK_IDS:
-            name_ = name.lower()
-            coords.append((row[name_, 'x'], row[name_, 'y'], row[name_, 'likelihood']))
-        frames.append(Landmarks(
-            names=tuple(_refs.LANDMARK_NAMES[i] for i in _refs.LANDMARK_IDS),
-            coords=_np.array(coords)
-        ))
-    return tuple(frames)
+    # look up the columns without level 0 (i.e. scorer),
+    # without copying (or modifying) the table itself
+    columns = tab.columns.droplevel(0)
+    cols = [(name.lower(), col) for col in ('x', 'y', 'likelihood') for name in _refs.LANDMARK_IDS]
+    positions = columns.get_indexer(cols)
+    if _np.any(positions < 0):
+        missing = [col for col, pos in zip(cols, positions) if pos < 0]
+        raise KeyError(f"columns not found in the DLC output: {missing}")
+
+    # extract all the x, y and likelihood columns at once, as a (N_frames, 3, K_landmarks) array.
+    # the `coords` of each frame is its transposed (K_landmarks, 3) view, so that
+    # `xy` and `p` are each laid out contiguously (i.e. in the column-major order)
+    # NOTE: pandas usually returns a column-major array, hence `ascontiguousarray`
+    coords = _np.ascontiguousarray(
+        tab.iloc[:, positions].to_numpy(dtype=_np.float64).reshape((-1, 3, len(_REF_NAMES))),
+        dtype=LANDMARK_DTYPE
+    )
+    return LandmarkSeries(names=_REF_NAMES, coords=coords.transpose(0, 2, 1))
 
 
 def write_alignment_table(
@@ -438,12 +851,26 @@ def write_alignment_table(
     outpath = Path(outpath)
     if not outpath.parent.exists():
         outpath.parent.mkdir(parents=True)
-    tab = _pd.DataFrame([item.to_dict() for item in alignment])
-    tab.to_csv(str(outpath), index=False, header=True)
+    alignment = tuple(alignment)
+    # NOTE: builds the columns at once, instead of one dict (of Python floats) per frame;
+    # the same columns, in the same order, as `Alignment.to_dict()`
+    warps = _np.array(
+        [(item.left, item.right) for item in alignment],
+        dtype=_np.float64
+    ).reshape((-1, 12))
+    tab = _pd.DataFrame(warps, columns=list(_ALIGNMENT_KEYS['left'] + _ALIGNMENT_KEYS['right']))
+    tab.insert(0, 'is_separate', _np.array([item.separate for item in alignment], dtype=bool))
+    _fileutils.write_table(tab, outpath)
 
 
 def load_alignment_table(srcpath: PathLike) -> Tuple[Alignment]:
-    tab = _pd.read_csv(srcpath)
+    tab = _fileutils.read_table(srcpath)
+    # all the matrices at once, in shape (num_frames, 2 (left/right), 2, 3)
+    warps = tab[list(_ALIGNMENT_KEYS['left'] + _ALIGNMENT_KEYS['right'])].to_numpy(
+        dtype=_np.float32
+    ).reshape((-1, 2, 2, 3))
+    separate = tab['is_separate'].to_numpy()
     return tuple(
-        Alignment.from_dict(tab.iloc[i].to_dict()) for i in range(tab.shape[0])
+        Alignment(left=warp[0], right=warp[1], separate=bool(sep))
+        for warp, sep in zip(warps, separate)
     )
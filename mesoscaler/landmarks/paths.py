@@ -26,6 +26,7 @@ import os as _os
 
 from .. import (
     defaults as _defaults,
+    fileutils as _fileutils,
 )
 from ..typing import (
     PathLike,
@@ -67,7 +68,7 @@ def predicted_landmarks_table_path(output_dir: Path) -> Path:
 
 
 def alignment_table_path(output_dir: Path) -> Path:
-    return output_dir / _defaults.ALIGNMENT_TABLE_NAME
+    return _fileutils.table_path(output_dir / _defaults.ALIGNMENT_TABLE_NAME)
 
 
 def aligned_landmarks_video_path(output_dir: Path) -> Path:
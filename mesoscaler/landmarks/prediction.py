@@ -26,11 +26,13 @@ import tempfile as _tempfile
 import shutil as _shutil
 
 import pandas as _pd
-import imageio.v3 as _iio
 
 from ..typing import (
     PathLike,
 )
+from .. import (
+    defaults as _defaults,
+)
 from . import (
     base as _base,
     paths as _paths,
@@ -39,7 +41,9 @@ from . import (
 
 def predict_dlc_landmarks(
     video_path: PathLike,
-    dlc_project_dir: Optional[PathLike] = None
+    dlc_project_dir: Optional[PathLike] = None,
+    batch_size: Optional[int] = None,
+    gpu: Optional[int] = None
 ) -> _base.DLCOutput:
     """use the video file at ``video_path``
     to estimate landmarks using DeepLabCut.
@@ -49,7 +53,14 @@ def predict_dlc_landmarks(
     If None is provided here, the value specified
     in the ``MESONET_DLC_PROJECT_DIR`` environment
     variable will be used.
+
+    ``batch_size`` is the number of frames to be fed to the
+    network at once (defaults to ``DLC_BATCH_SIZE``), and ``gpu``
+    is the index of the GPU to be used (lets DeepLabCut decide
+    if None is provided).
     """
+    if batch_size is None:
+        batch_size = _defaults.DLC_BATCH_SIZE
     video_path = Path(video_path)
     configpath = _paths.dlc_config_path(dlc_project_dir)
 
@@ -68,26 +79,29 @@ def predict_dlc_landmarks(
             str(configpath),
             [sourcepath],
             videotype='.mp4',
-            gputouse=None,
+            gputouse=gpu,
+            batchsize=batch_size,
             TFGPUinference=False,
         )
         _os.chdir(str(_cwd))  # NOTE: just in case DLC calls `chdir`
-        _dlc.create_labeled_video(
-            str(configpath),
-            [sourcepath],
-            filtered=False
-        )
-        _os.chdir(str(_cwd))  # NOTE: just in case DLC calls `chdir`
 
         tablepath = search_pattern(tempdir, '*.h5')
-        labeledpath = search_pattern(tempdir, '*labeled.mp4')
-
         table = _pd.read_hdf(tablepath, key='df_with_missing')
-        labeled = _iio.imread(str(labeledpath))
-        return _base.DLCOutput(table=table, images=labeled)
     finally:
         _shutil.rmtree(tempdir)
 
+    # NOTE: instead of letting DLC encode a labeled video (only to decode it here),
+    # the predicted landmarks are drawn onto the frames of the source video
+    # when they are read out. as in DLC's labeled videos, each landmark
+    # has its own color, and the low-likelihood predictions are left out
+    labeled = _base.LazyVideo(
+        video_path,
+        annotations=_base.landmarks_from_dlc_output(table),
+        likelihood_threshold=_defaults.LANDMARK_LIKELIHOOD_THRESHOLD,
+        colors=_base.LANDMARK_COLORS
+    )
+    return _base.DLCOutput(table=table, images=labeled)
+
 
 def search_pattern(directory: Path, pattern: str) -> Path:
     candidates = list(directory.glob(pattern))
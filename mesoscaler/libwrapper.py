@@ -25,3 +25,30 @@ import warnings as _warnings
 with _warnings.catch_warnings():
     _warnings.simplefilter('ignore', category=UserWarning)
     import h5py  # noqa: F401
+
+try:
+    from numba import njit  # noqa: F401
+    HAS_NUMBA = True
+except ImportError:
+    HAS_NUMBA = False
+
+    def njit(*args, **kwargs):
+        """a no-op replacement of `numba.njit`, in case Numba is not installed.
+        check `HAS_NUMBA` to select NumPy-based code paths instead."""
+        if (len(args) == 1) and callable(args[0]) and (len(kwargs) == 0):
+            return args[0]
+        return lambda fn: fn
+
+try:
+    import tifffile  # noqa: F401
+    HAS_TIFFFILE = True
+except ImportError:
+    tifffile = None
+    HAS_TIFFFILE = False
+
+try:
+    import pyarrow.csv as pyarrow_csv  # noqa: F401
+    HAS_PYARROW = True
+except ImportError:
+    pyarrow_csv = None
+    HAS_PYARROW = False
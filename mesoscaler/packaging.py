@@ -103,8 +103,8 @@ def package_matfile(
 
     name    = Path(results.name).stem
     outpath = (output_dir / f"{name}_mesoscaler.mat")
-    if not outpath.parent.exists():
-        outpath.parent.mkdir(parents=True)
+    # NOTE: `exist_ok` as the directory may be created concurrently by other writers
+    outpath.parent.mkdir(parents=True, exist_ok=True)
     _sio.savemat(
         str(outpath),
         data
@@ -116,12 +116,16 @@ def package_hdf(
     output_dir: PathLike,
     **options
 ):
+    """`options` can be used to override the arguments to `create_dataset`.
+    by default, the datasets are (auto-)chunked and LZF-compressed."""
+    options.setdefault('compression', 'lzf')
+    options.setdefault('shuffle', True)
     output_dir = Path(output_dir)
     name    = Path(results.name).stem
     outpath = (output_dir / f"{name}_mesoscaler.h5")
     keys = results.package_keys()
-    if not outpath.parent.exists():
-        outpath.parent.mkdir(parents=True)
+    # NOTE: `exist_ok` as the directory may be created concurrently by other writers
+    outpath.parent.mkdir(parents=True, exist_ok=True)
     with _h5.File(str(outpath), 'w') as out:
         for k, v in results.rois.metadata_dict(with_roi_metadata=False).items():
             out.attrs[k] = v
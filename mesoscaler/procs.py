@@ -23,12 +23,14 @@
 """the procedures that correspond to the individual steps of the pipeline."""
 
 from pathlib import Path
-from typing import Optional, Tuple, Union
-
-import pandas as _pd
-import imageio.v3 as _iio
+from typing import Optional, Iterable, Tuple, Union
+import collections as _collections
+import concurrent.futures as _futures
+import contextlib as _contextlib
+import os as _os
 
 from . import (
+    defaults as _defaults,
     images as _images,
     landmarks as _landmarks,
     rois as _rois,
@@ -42,17 +44,31 @@ from .typing import (
     Suffixes,
     ResultsFileType,
 )
+from .libwrapper import (
+    h5py as _h5
+)
+
+# the maximum number of packaged results waiting to be written out
+# in `run_packaging_all_results`
+MAX_PENDING_WRITES = 4
 
 
 def run_image_collection(
     input_dir_or_files: Union[PathLike, InputImageFiles],
     output_dir: PathLike,
     suffixes: Optional[Suffixes] = None,
-    video_fps: Optional[Number] = None
+    video_fps: Optional[Number] = None,
+    image_names: Optional[Iterable[str]] = None,
+    jobs: Optional[int] = None
 ) -> Path:
     """collect images from ``input_dir_or_files``, and stores the followings
     in ``output_dir``. creates the directory if not existent.
-    returns the output directory as a ``Path``."""
+    returns the output directory as a ``Path``.
+
+    ``image_names`` may be supplied in case the images are processed
+    in chunks, so that their names remain unique across the chunks.
+
+    ``jobs`` specifies the number of threads used to load and rescale images."""
     output_dir = Path(output_dir)
     if isinstance(input_dir_or_files, (str, Path)):
         input_dir = Path(input_dir_or_files)
@@ -60,8 +76,9 @@ def run_image_collection(
     else:
         paths = tuple(Path(path) for path in input_dir_or_files)
 
-    images = _images.load_images(paths)
-    image_names = _fileutils.unique_names_from_path(paths)
+    images = _images.load_images(paths, jobs=jobs)
+    if image_names is None:
+        image_names = _fileutils.unique_names_from_path(paths)
 
     video_path = _images.collected_images_video_path(output_dir)
     table_path = _images.collected_images_metadata_path(output_dir)
@@ -69,7 +86,7 @@ def run_image_collection(
     if not output_dir.exists():
         output_dir.mkdir(parents=True)
 
-    _images.write_rescaled_video(video_path, images, fps=video_fps)
+    _images.write_rescaled_video(video_path, images, fps=video_fps, jobs=jobs)
     _images.write_metadata_table(table_path, images, image_names=image_names)
     return output_dir
 
@@ -78,12 +95,16 @@ def run_landmark_prediction(
     input_dir: PathLike,
     output_dir: PathLike,
     dlc_project_dir: Optional[PathLike] = None,
-    video_fps: Optional[Number] = None
+    video_fps: Optional[Number] = None,
+    batch_size: Optional[int] = None,
+    gpu: Optional[int] = None
 ) -> Path:
     """uses the collected images video from ``input_dir``, and predict landmarks
     using the DeepLabCut network.
 
     writes the labeled video and the prediction results into ``output_dir``.
+
+    ``batch_size`` and ``gpu`` are passed to `predict_dlc_landmarks`.
     """
     input_dir = Path(input_dir)
     output_dir = Path(output_dir)
@@ -92,7 +113,12 @@ def run_landmark_prediction(
     else:
         dlc_project_dir = Path(dlc_project_dir)
     source_video = _images.collected_images_video_path(input_dir)
-    output = _landmarks.predict_dlc_landmarks(source_video, dlc_project_dir)
+    output = _landmarks.predict_dlc_landmarks(
+        source_video,
+        dlc_project_dir,
+        batch_size=batch_size,
+        gpu=gpu
+    )
     labeled_video_path = _landmarks.predicted_landmarks_video_path(output_dir)
     labels_table_path  = _landmarks.predicted_landmarks_table_path(output_dir)
     if not output_dir.exists():
@@ -119,7 +145,7 @@ def run_landmark_alignment(
     input_dir = Path(input_dir)
     output_dir = Path(output_dir)
     dlc_in: _landmarks.DLCOutput = _landmarks.DLCOutput.from_directory(input_dir)
-    landmarks: Tuple[_landmarks.Landmarks] = _landmarks.landmarks_from_dlc_output(dlc_in)
+    landmarks: _landmarks.LandmarkSeries   = _landmarks.landmarks_from_dlc_output(dlc_in)
     reference: _landmarks.Landmarks        = _landmarks.load_reference_landmarks()
     alignment: Tuple[_landmarks.Alignment] = _landmarks.align_dlc_landmarks(
         landmarks,
@@ -152,8 +178,22 @@ def run_rois_generation(
     alignment_dir: PathLike,
     output_dir: PathLike,
     file_type: ResultsFileType,
-    resize: bool = True
+    resize: bool = True,
+    jobs: Optional[int] = None,
+    consolidate: bool = False
 ) -> Path:
+    """generates ROIs for each of the images, and writes them out
+    to ``output_dir``.
+
+    the images are processed in parallel using ``jobs`` processes
+    (defaults to the number of CPUs). ``jobs=1`` processes them
+    in the current process.
+
+    by default, one file is written per image. if ``consolidate`` is set
+    (only for the 'hdf' file type), all the ROI sets are instead written
+    into a single file (``all_rois.h5``), one group per image.
+    `run_packaging_all_results` reads either of them.
+    """
     metadata_dir = Path(metadata_dir)
     alignment_dir = Path(alignment_dir)
     output_dir = Path(output_dir)
@@ -164,26 +204,66 @@ def run_rois_generation(
     alignment_table_path = _landmarks.alignment_table_path(alignment_dir)
     alignment: Tuple[_landmarks.Alignment] = _landmarks.load_alignment_table(alignment_table_path)
 
-    for roiset in _rois.generate_rois_batch(
-        alignment,
-        metadata=metadata,
-        reference=_rois.load_reference_ROIs(),
-        outline=_rois.load_reference_outlines(),
-        resize=resize
-    ):
-        if roiset.total_frames == 1:
-            outbase = Path(roiset.image_name).stem
-        else:
-            digits = _fileutils.required_number_of_digits(roiset.total_frames)
-            outbase = f"{Path(roiset.image_name).stem}_frame{str(roiset.frame_idx).zfill(digits)}"
-        suffix = _fileutils.get_roi_file_suffix(file_type)
-        outfile = output_dir / f"{outbase}_rois{suffix}"
-        if not output_dir.exists():
-            output_dir.mkdir(parents=True)
-        roiset.to_file(outfile, file_type)
+    rows = metadata.to_dict('records')
+    if len(alignment) < len(rows):
+        raise ValueError(f"the number of alignments ({len(alignment)}) is less than the number of images ({len(rows)})")
+    if consolidate and (file_type != 'hdf'):
+        raise ValueError(f"consolidated ROI output is only available for the 'hdf' file type, got {repr(file_type)}")
+    outbases = tuple(_rois_file_base(row['Image'], row['Frame'], row['TotalFrames']) for row in rows)
+    if len(set(outbases)) < len(outbases):
+        duplicates = sorted(set(base for base in outbases if outbases.count(base) > 1))
+        raise ValueError(f"multiple images map to the same ROI file name: {duplicates}")
+    # NOTE: created once here, not per ROI file
+    output_dir.mkdir(parents=True, exist_ok=True)
+    if consolidate:
+        # the ROI sets are sent back from the workers, and written here
+        with _contextlib.closing(_rois.iter_rois_batch(alignment, metadata, resize=resize, jobs=jobs)) as roisets, \
+                _h5.File(str(output_dir / _defaults.CONSOLIDATED_ROIS_FILE_NAME), 'w') as out:
+            for outbase, roiset in zip(outbases, roisets):
+                roiset.append_to_hdf(out, outbase, packed=True, stacked=True)
+    else:
+        # NOTE: otherwise the consolidated file of an earlier run
+        # would take precedence over the new files during packaging
+        try:
+            (output_dir / _defaults.CONSOLIDATED_ROIS_FILE_NAME).unlink()
+        except FileNotFoundError:
+            pass
+        outfiles = tuple(
+            output_dir / _rois_file_name(row['Image'], row['Frame'], row['TotalFrames'], file_type)
+            for row in rows
+        )
+        # NOTE: the masks are stored bit-packed and stacked in the intermediate ROI files
+        options = dict(packed=True, stacked=True) if file_type == 'hdf' else dict()
+        _rois.generate_rois_batch(
+            alignment,
+            metadata,
+            resize=resize,
+            jobs=jobs,
+            out_paths=outfiles,
+            file_type=file_type,
+            **options
+        )
     return output_dir
 
 
+def _rois_file_base(image: str, frame: int, total_frames: int) -> str:
+    """the base name of the ROI file for a row of the metadata table
+    (i.e. its `Image`, `Frame` and `TotalFrames` fields).
+
+    the directories in `Image` (kept by `unique_names_from_path` to tell apart
+    the images with the same file name) are joined with underscores."""
+    name = _os.path.splitext(image)[0].replace('\\', '_').replace('/', '_')
+    if total_frames == 1:
+        return name
+    digits = _fileutils.required_number_of_digits(total_frames)
+    return f"{name}_frame{str(frame).zfill(digits)}"
+
+
+def _rois_file_name(image: str, frame: int, total_frames: int, file_type: ResultsFileType) -> str:
+    """the name of the ROI file for a row of the metadata table."""
+    return f"{_rois_file_base(image, frame, total_frames)}_rois{_fileutils.get_roi_file_suffix(file_type)}"
+
+
 def run_packaging_all_results(
     metadata_dir: PathLike,
     landmarks_dir: PathLike,
@@ -218,7 +298,7 @@ def run_packaging_all_results(
     # load: resized-images, metadata, landmarks, alignment
     metadata_table_path = _images.collected_images_metadata_path(metadata_dir)
     alignment_table_path = _landmarks.alignment_table_path(alignment_dir)
-    dlcoutput = _landmarks.DLCOutput.from_directory(landmarks_dir)
+    dlcoutput = _landmarks.DLCOutput.from_directory(landmarks_dir, load_images=False)
     collected_images_path = _images.collected_images_video_path(metadata_dir)
     landmarks_video_path  = _landmarks.predicted_landmarks_video_path(landmarks_dir)
     alignment_video_path  = _landmarks.aligned_landmarks_video_path(alignment_dir)
@@ -226,9 +306,6 @@ def run_packaging_all_results(
     metadata  = _images.load_metadata_table(metadata_table_path)
     landmarks = _landmarks.landmarks_from_dlc_output(dlcoutput)
     alignment = _landmarks.load_alignment_table(alignment_table_path)
-    source_images    = _iio.imread(str(collected_images_path))
-    landmarks_images = _iio.imread(str(landmarks_video_path))
-    alignment_images = _iio.imread(str(alignment_video_path))
 
     # for each source frame:
     # 1. find roi HDF5 file and read ROIs from it
@@ -236,27 +313,55 @@ def run_packaging_all_results(
     #    - landmarks (in 512 x 512),
     #    - reference-to-data alignment (in 512 x 512)
     #    - rois (in the size registered in the ROIs file)
-    def _get_roifile(row: _pd.Series) -> Tuple[str, Path]:
-        name = str(Path(row.Image).with_suffix(''))
-        if row.TotalFrames == 1:
-            roibase = name
+    # NOTE: the paths are handled as strings, instead of building `Path` objects per row
+    rois_root = _os.fspath(rois_dir)
+    consolidated_path = rois_dir / _defaults.CONSOLIDATED_ROIS_FILE_NAME
+
+    def _load_rois(row: Tuple, consolidated: Optional[_h5.File]) -> _rois.ROISet:
+        # NOTE: the same naming as `run_rois_generation`; the ROIs are always read from HDF5
+        if consolidated is not None:
+            return _rois.ROISet.load_hdf(consolidated[_rois_file_base(row.Image, row.Frame, row.TotalFrames)])
+        roifile = _os.path.join(rois_root, _rois_file_name(row.Image, row.Frame, row.TotalFrames, 'hdf'))
+        return _rois.ROISet.load_hdf(roifile)
+
+    # NOTE: `itertuples` avoids building a `Series` for every row.
+    # the results are written out on a separate thread, while the next
+    # frames are being decoded and the next ROIs are being read.
+    pending = _collections.deque()
+    with _contextlib.ExitStack() as stack, _futures.ThreadPoolExecutor(max_workers=1) as writer:
+        # NOTE: the ROIs written by `run_rois_generation(consolidate=True)`
+        # are read from the single file, which is kept open throughout
+        if consolidated_path.exists():
+            consolidated = stack.enter_context(_h5.File(str(consolidated_path), 'r'))
         else:
-            digits = _fileutils.required_number_of_digits(row.TotalFrames)
-            roibase = f"{name}_frame{str(row.Frame).zfill(digits)}"
-        return name, (rois_dir / f"{roibase}_rois.h5")
-
-    for idx, row in metadata.iterrows():
-        basename, roifile = _get_roifile(row)
-        results = _packaging.Results(
-            name=basename,
-            images=_packaging.ResultImages(
-                source=source_images[idx],
-                landmarks=landmarks_images[idx],
-                alignment=alignment_images[idx]
-            ),
-            landmarks=landmarks[idx],
-            alignment=alignment[idx],
-            rois=_rois.ROISet.load_hdf(roifile),
-            datatype='512'  # NOTE: assumes 512x512 for the time being
-        )
-        _write_to_file(results, output_dir=output_dir)
+            consolidated = None
+        # NOTE: the videos are decoded frame by frame alongside
+        # the metadata, instead of being loaded as a whole.
+        # the decoders are closed as soon as the loop ends (or fails).
+        decoders = []
+        for path in (collected_images_path, landmarks_video_path, alignment_video_path):
+            video = stack.enter_context(_contextlib.closing(_landmarks.LazyVideo(path)))
+            decoders.append(stack.enter_context(_contextlib.closing(video.iter_frames())))
+        frames = zip(*decoders)
+        for idx, row in zip(metadata.index, metadata.itertuples(index=False)):
+            try:
+                source_image, landmarks_image, alignment_image = next(frames)
+            except StopIteration:
+                raise ValueError(f"the videos contain fewer frames than the metadata ({metadata.shape[0]})") from None
+            results = _packaging.Results(
+                name=_os.path.splitext(row.Image)[0],
+                images=_packaging.ResultImages(
+                    source=source_image,
+                    landmarks=landmarks_image,
+                    alignment=alignment_image
+                ),
+                landmarks=landmarks[idx],
+                alignment=alignment[idx],
+                rois=_load_rois(row, consolidated),
+                datatype='512'  # NOTE: assumes 512x512 for the time being
+            )
+            pending.append(writer.submit(_write_to_file, results, output_dir=output_dir))
+            if len(pending) > MAX_PENDING_WRITES:
+                pending.popleft().result()
+        while len(pending) > 0:
+            pending.popleft().result()
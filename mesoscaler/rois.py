@@ -20,10 +20,15 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 from pathlib import Path
-from typing import Dict, Tuple, Union, Optional, Any
+from typing import Dict, Tuple, Union, Optional, Sequence, Iterator, Any
 from typing_extensions import Self
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+import collections as _collections
+import concurrent.futures as _futures
+import functools as _functools
+import itertools as _itertools
 import json as _json
+import os as _os
 import warnings as _warnings
 
 import numpy as _np
@@ -42,6 +47,7 @@ from .libwrapper import (
     h5py as _h5
 )
 from . import (
+    defaults as _defaults,
     landmarks as _landmarks,
 )
 
@@ -52,16 +58,55 @@ LEFT_OUTLINE_FILE = "atlas_outline_left.png"
 RIGHT_OUTLINE_FILE = "atlas_outline_right.png"
 REFERENCE_NAME = '__reference__'
 
+# the upper bound for the size of the HDF5 chunks of the masks
+# (i.e. the default size of the HDF5 chunk cache)
+MAX_CHUNK_BYTES = 1 << 20
+
+# the number of frames per process that `iter_rois_batch` submits
+# ahead of the results being consumed
+MAX_PENDING_FRAMES_PER_JOB = 2
+
+# the value of the `layout` attribute of the ROI-set groups written with `stacked=True`
+STACKED_LAYOUT = 'stacked'
+
+# the per-ROI metadata table of the stacked layout
+_STACKED_METADATA_DTYPE = _np.dtype([
+    ('name', _h5.string_dtype()),
+    ('side', _h5.string_dtype()),
+    ('AllenID', _np.int32),
+    ('description', _h5.string_dtype()),
+])
+
+
+def _mask_chunks(shape: Tuple[int, ...], itemsize: int = 1) -> Tuple[int, ...]:
+    """returns the HDF5 chunk shape for a mask: a single chunk for the whole mask
+    if it fits in `MAX_CHUNK_BYTES`, and bands of full rows otherwise."""
+    row_bytes = int(_np.prod(shape[1:], dtype=_np.int64)) * itemsize
+    rows = max(1, min(shape[0], MAX_CHUNK_BYTES // max(row_bytes, 1)))
+    return (rows,) + tuple(shape[1:])
+
+
+def _as_uint8(mask: _npt.NDArray) -> _npt.NDArray:
+    """returns `mask` as a uint8 array, without copying
+    in case it is already a uint8 or a boolean array."""
+    if mask.dtype == _np.bool_:
+        return mask.view(_np.uint8)
+    return mask.astype(_np.uint8, copy=False)
+
 
 @dataclass
 class ROI:
     """manages a single ROI of an image."""
     name: str
     side: Hemisphere
-    AllenID: int
+    AllenID: int  # -1 for ROIs without an Allen ID (e.g. outlines)
     description: str
     mask: _npt.NDArray
 
+    _cache: Dict[str, Any] = field(
+        default_factory=dict, init=False, repr=False, compare=False
+    )  # cache of the values derived from `mask`
+
     @property
     def image_width(self) -> int:
         return self.image_shape[1]
@@ -74,13 +119,51 @@ class ROI:
     def image_shape(self) -> Tuple[int, int]:
         return self.mask.shape
 
+    @property
+    def bounds(self) -> Optional[Tuple[int, int, int, int]]:
+        """the bounding box (x0, x1, y0, y1; inclusive) of the mask,
+        or None if the mask is empty. it is computed once, i.e. the mask
+        is not supposed to be modified afterwards."""
+        if 'bounds' not in self._cache:
+            self._cache['bounds'] = _landmarks.affine.nonzero_bounds(self.mask)
+        return self._cache['bounds']
+
     @classmethod
-    def load_hdf(cls, entry: _h5.Dataset) -> Self:
-        name = entry.attrs['name']
-        side = entry.attrs['side']
-        allenID = entry.attrs.get('AllenID', 0)
-        desc = entry.attrs['description']
-        mask = _np.array(entry, copy=False).astype(bool)
+    def load_hdf(
+        cls,
+        entry: _h5.Dataset,
+        out: Optional[_npt.NDArray] = None
+    ) -> Self:
+        """`out`, if given, is a contiguous array of the same shape and dtype
+        as `entry`, into which the mask is read.
+
+        bit-packed masks (see `ROISet.to_hdf`) are unpacked."""
+        # NOTE: reads all the attributes at once
+        attrs = dict(entry.attrs.items())
+        name = attrs['name']
+        side = attrs['side']
+        # NOTE: earlier versions omitted the attribute for ROIs without Allen IDs
+        allenID = int(attrs.get('AllenID', -1))
+        desc = attrs['description']
+        if out is None:
+            mask = entry[()]
+        else:
+            entry.read_direct(out)
+            mask = out
+        if 'packed_width' in attrs:
+            width = int(attrs['packed_width'])
+            return cls(
+                name=name,
+                side=side,
+                AllenID=allenID,
+                description=desc,
+                mask=_np.unpackbits(mask, axis=-1, count=width).view(bool)
+            )
+        if mask.dtype.itemsize == 1:
+            # NOTE: thresholds in place, reusing the buffer that has just been read
+            mask = _np.not_equal(mask, 0, out=mask.view(bool))
+        else:
+            mask = (mask != 0)
         return cls(
             name=name,
             side=side,
@@ -92,46 +175,52 @@ class ROI:
     def _write_hdf(
         self,
         parent: _h5.Group,
+        packed: bool = False,
         **options
     ):
         if self.side in ('left', 'right'):
             side = self.side
-            if side not in parent.keys():
+            if side not in parent:
                 parent.create_group(side)
             hemi = parent[side]
         else:
             hemi = parent
 
-        if self.name in hemi.keys():
+        if self.name in hemi:
             del hemi[self.name]
+        data = _as_uint8(self.mask)
+        if packed:
+            data = _np.packbits(data, axis=-1)
+        if data.size > 0:
+            options.setdefault('chunks', _mask_chunks(data.shape, data.itemsize))
         entry = hemi.create_dataset(
             self.name,
-            data=self.mask.astype(_np.uint8),
+            data=data,
             **options
         )
+        if packed:
+            entry.attrs['packed_width'] = self.mask.shape[-1]
         entry.attrs['name'] = self.name
         entry.attrs['side'] = self.side
-        if self.AllenID >= 0:
-            entry.attrs['AllenID'] = self.AllenID
+        entry.attrs.create('AllenID', self.AllenID, dtype=_np.int32)
         entry.attrs['description'] = self.description
     
     def _write_metadata(self, metadata: Dict[str, Any]):
-        if self.name in metadata.keys():
+        if self.name in metadata:
             return
         metadata[self.name] = dict()
         metadata[self.name]['name'] = self.name
-        if self.AllenID >= 0:
-            metadata[self.name]['AllenID'] = self.AllenID
+        metadata[self.name]['AllenID'] = self.AllenID
         metadata[self.name]['description'] = self.description
     
     def _write_data(self, data: Dict[str, Any]):
         if self.side in ('left', 'right'):
-            if self.side not in data.keys():
+            if self.side not in data:
                 data[self.side] = dict()
             hemi = data[self.side]
         else:
             hemi = data
-        hemi[self.name] = self.mask.astype(_np.uint8)
+        hemi[self.name] = _as_uint8(self.mask)
 
 
 @dataclass
@@ -146,11 +235,8 @@ class ROISet:
     def names(self) -> Tuple[str]:
         """the names of the ROIs, as it has been registered to this ROISet.
         Duplicates are supposed to be removed."""
-        names = []
-        for roi in self.rois:
-            if roi.name not in names:
-                names.append(roi.name)
-        return tuple(names)
+        # NOTE: `dict.fromkeys` removes duplicates while keeping the order
+        return tuple(dict.fromkeys(roi.name for roi in self.rois))
     
     @property
     def image_shape(self) -> Tuple[int, int]:
@@ -165,26 +251,44 @@ class ROISet:
         return self.image_shape[0]
     
     @classmethod
-    def load_hdf(cls, path: PathLike) -> Self:
-        with _h5.File(str(path), 'r') as src:
-            image_name   = src.attrs['image_name']
-            frame_idx    = src.attrs['frame_idx']
-            total_frames = src.attrs['total_frames']
-
-            rois = []
-            roi_names = _json.loads(src.attrs['names'])
-            for key in src.keys():
-                if key in ('left', 'right'):
-                    group = src[key]
-                    for name in roi_names:
-                        rois.append(ROI.load_hdf(group[name]))
-                else:
-                    rois.append(ROI.load_hdf(src[key]))
+    def load_hdf(cls, src: Union[PathLike, _h5.Group]) -> Self:
+        """`src` may also be an open group, e.g. one that has been
+        written using `append_to_hdf`. the file is then left open."""
+        if isinstance(src, (str, Path)):
+            with _h5.File(_os.fspath(src), 'r') as file:
+                return cls.load_hdf(file)
+
+        attrs = dict(src.attrs.items())
+        image_name   = attrs['image_name']
+        frame_idx    = attrs['frame_idx']
+        total_frames = attrs['total_frames']
+
+        if attrs.get('layout', None) == STACKED_LAYOUT:
+            return cls(
+                image_name=image_name,
+                frame_idx=frame_idx,
+                total_frames=total_frames,
+                rois=_load_stacked_rois(src)
+            )
+
+        entries = []
+        roi_names = attrs['names']
+        if isinstance(roi_names, str):
+            # files written by earlier versions store the names in JSON
+            roi_names = _json.loads(roi_names)
+        for key in src.keys():
+            if key in ('left', 'right'):
+                group = src[key]
+                for name in roi_names:
+                    entries.append(group[name])
+            else:
+                entries.append(src[key])
+        buffers = _read_buffers(entries)
         return cls(
             image_name=image_name,
             frame_idx=frame_idx,
             total_frames=total_frames,
-            rois=tuple(rois)
+            rois=tuple(ROI.load_hdf(entry, out=buf) for entry, buf in zip(entries, buffers))
         )
 
     def to_hdf(
@@ -192,18 +296,35 @@ class ROISet:
         parent: Union[PathLike, _h5.Group],
         group_key: str = 'rois',
         write_metadata: bool = True,
+        packed: bool = False,
+        stacked: bool = False,
         **options
     ) -> Union[str, _h5.Group]:
-        """`options` can be used to pass to `create_dataset`"""
+        """`options` can be used to override the arguments to `create_dataset`.
+        by default, the masks are LZF-compressed, each in a single chunk
+        (or in bands of rows of up to `MAX_CHUNK_BYTES`, for large masks).
+
+        if `packed` is True, the masks are thresholded and written bit-packed
+        along their rows (see `numpy.packbits`), with their original widths
+        in the `packed_width` attributes. `load_hdf` unpacks them.
+
+        if `stacked` is True, the masks (which must be of the same shape)
+        are written as a single (K, H, W) `masks` dataset, together with
+        a `meta` table of the ROI metadata, instead of one dataset per ROI
+        (the layout described in FILE_STRUCTURE.md). `load_hdf` reads
+        either layout."""
+        options.setdefault('compression', 'lzf')
         if isinstance(parent, (str, Path)):
-            with _h5.File(str(parent), 'w') as out:
+            with _h5.File(_os.fspath(parent), 'w') as out:
                 self.to_hdf(
                     out,
                     group_key='',
                     write_metadata=write_metadata,
+                    packed=packed,
+                    stacked=stacked,
                     **options
                 )
-            return str(parent)
+            return _os.fspath(parent)
         else:
             if write_metadata:
                 for key, val in self.metadata_dict(with_roi_metadata=False).items():
@@ -212,28 +333,84 @@ class ROISet:
                 rois = parent
             else:
                 rois = parent.create_group(group_key)
-            rois.attrs['names']  = _json.dumps(self.names, indent=None)
-            for roi in self.rois:
-                roi._write_hdf(rois, **options)
+            rois.attrs.create('names', self.names, dtype=_h5.string_dtype())
+            if stacked:
+                self._write_stacked_hdf(rois, packed=packed, **options)
+            else:
+                for roi in self.rois:
+                    roi._write_hdf(rois, packed=packed, **options)
             return rois
+
+    def _write_stacked_hdf(
+        self,
+        group: _h5.Group,
+        packed: bool = False,
+        **options
+    ):
+        shapes = set(roi.mask.shape for roi in self.rois)
+        if len(shapes) > 1:
+            raise ValueError(f"the stacked layout requires the masks to be of the same shape, got {sorted(shapes)}")
+        shape = shapes.pop() if len(shapes) > 0 else (0, 0)
+        width = shape[-1]
+        if packed:
+            shape = shape[:-1] + ((width + 7) // 8,)
+        shape = (len(self.rois),) + shape
+        if _np.prod(shape) > 0:
+            options.setdefault('chunks', (1,) + _mask_chunks(shape[1:]))
+        entry = group.create_dataset('masks', shape=shape, dtype=_np.uint8, **options)
+        # NOTE: each mask is written directly from its own buffer,
+        # without first being copied into a (K, H, W) array
+        for idx, roi in enumerate(self.rois):
+            data = _as_uint8(roi.mask)
+            if packed:
+                data = _np.packbits(data, axis=-1)
+            if data.size > 0:
+                entry.write_direct(_np.ascontiguousarray(data), dest_sel=_np.s_[idx])
+        if packed:
+            entry.attrs['packed_width'] = width
+
+        meta = _np.empty(len(self.rois), dtype=_STACKED_METADATA_DTYPE)
+        meta['name'] = [roi.name for roi in self.rois]
+        meta['side'] = [roi.side for roi in self.rois]
+        meta['AllenID'] = [roi.AllenID for roi in self.rois]
+        meta['description'] = [roi.description for roi in self.rois]
+        group.create_dataset('meta', data=meta)
+        group.attrs['layout'] = STACKED_LAYOUT
     
+    def append_to_hdf(
+        self,
+        parent: _h5.Group,
+        group_name: str,
+        **options
+    ) -> _h5.Group:
+        """writes this ROISet as a new group `group_name` of `parent`,
+        with the metadata as the attributes of the group.
+        used to write many ROISets into a single file."""
+        return self.to_hdf(
+            parent.create_group(group_name),
+            group_key='',
+            write_metadata=True,
+            **options
+        )
+
     def to_matfile(self, path: PathLike):
         metadata = dict()
         metadata['image_name'] = self.image_name
         metadata['frame_idx']  = self.frame_idx
-        metadata['rois'] = dict()
+        metadata['rois'] = roi_metadata = dict()
         data = dict()
         for roi in self.rois:
-            roi._write_metadata(metadata['rois'])
+            roi._write_metadata(roi_metadata)
             roi._write_data(data)
         _sio.savemat(str(path), {
             'metadata': metadata,
             'rois': data
         })
     
-    def to_file(self, path: PathLike, filetype: ResultsFileType):
+    def to_file(self, path: PathLike, filetype: ResultsFileType, **options):
+        """`options` are passed to `to_hdf` (they are not used for MATLAB files)."""
         if filetype == 'hdf':
-            self.to_hdf(path)
+            self.to_hdf(path, **options)
         elif filetype == 'matlab':
             self.to_matfile(path)
         else:
@@ -243,11 +420,9 @@ class ROISet:
         ret = dict()
         for roi in self.rois:
             if roi.side in ('left', 'right'):
-                if roi.side not in ret.keys():
-                    ret[roi.side] = dict()
-                ret[roi.side][roi.name] = roi.mask.astype(_np.uint8)
+                ret.setdefault(roi.side, dict())[roi.name] = _as_uint8(roi.mask)
             elif roi.side == 'both':
-                ret[roi.name] = roi.mask.astype(_np.uint8)
+                ret[roi.name] = _as_uint8(roi.mask)
             else:
                 raise ValueError(f"unexpected hemisphere spec: {repr(roi.side)}")
         return ret
@@ -279,24 +454,133 @@ def generate_rois_batch(
     metadata: _pd.DataFrame,
     reference: Optional[ROISet] = None,
     outline: Optional[ROISet] = None,
-    resize: bool = True
-) -> Tuple[ROISet]:
+    resize: bool = True,
+    jobs: Optional[int] = None,
+    out_paths: Optional[Sequence[PathLike]] = None,
+    file_type: ResultsFileType = 'hdf',
+    **options
+) -> Union[Tuple[ROISet], Tuple[str]]:
+    """generates ROI sets for each row of `metadata`.
+
+    the frames are processed in parallel using `jobs` processes
+    (defaults to the number of CPUs). a single job (e.g. `jobs=1`, or
+    a single frame) processes them in the current process.
+
+    if `out_paths` is given, each ROI set is written to the corresponding
+    path as soon as it is generated (using `ROISet.to_file` with `options`),
+    and the paths are returned instead of the ROI sets."""
+    return tuple(iter_rois_batch(
+        alignment,
+        metadata,
+        reference=reference,
+        outline=outline,
+        resize=resize,
+        jobs=jobs,
+        out_paths=out_paths,
+        file_type=file_type,
+        **options
+    ))
+
+
+def iter_rois_batch(
+    alignment: Tuple[_landmarks.Alignment],
+    metadata: _pd.DataFrame,
+    reference: Optional[ROISet] = None,
+    outline: Optional[ROISet] = None,
+    resize: bool = True,
+    jobs: Optional[int] = None,
+    out_paths: Optional[Sequence[PathLike]] = None,
+    file_type: ResultsFileType = 'hdf',
+    **options
+) -> Iterator[Union[ROISet, str]]:
+    """the same as `generate_rois_batch`, but yields the results
+    in the order of the rows, as soon as each of them is ready.
+
+    at most `MAX_PENDING_FRAMES_PER_JOB` frames per process are submitted
+    ahead of the results being consumed, so that the ROI sets do not pile up
+    when the caller (e.g. writing them out) is slower than the workers."""
     if reference is None:
         reference = load_reference_ROIs()
     if outline is None:
         outline = load_reference_outlines()
-    sets = []
-    for rowidx, row in metadata.iterrows():
-        sets.append(
-            generate_rois_single(
-                alignment[rowidx],
-                row.to_dict(),
-                reference=reference,
-                outline=outline,
-                resize=resize
-            )
-        )
-    return tuple(sets)
+    if out_paths is None:
+        out_paths = _itertools.repeat(None)
+    elif len(out_paths) != len(metadata):
+        raise ValueError(f"the number of output paths ({len(out_paths)}) does not match the number of frames ({len(metadata)})")
+    # NOTE: `to_dict('records')` converts all the rows at once
+    args = (
+        tuple(alignment[rowidx] for rowidx in metadata.index),
+        metadata.to_dict('records'),
+        _itertools.repeat(resize),
+        out_paths,
+        _itertools.repeat(file_type),
+        _itertools.repeat(options),
+    )
+    if jobs is None:
+        jobs = _os.cpu_count() or 1
+    # NOTE: no more workers than there are frames
+    jobs = min(jobs, len(metadata))
+    if jobs <= 1:
+        # NOTE: the references are passed directly, leaving the global of the workers untouched
+        yield from map(_functools.partial(_generate_rois_item, reference, outline), *args)
+        return
+    # NOTE: the reference ROIs are passed once per worker, instead of once per frame
+    pending = _collections.deque()
+    with _futures.ProcessPoolExecutor(
+        max_workers=jobs,
+        initializer=_init_batch_worker,
+        initargs=(reference, outline)
+    ) as executor:
+        try:
+            # NOTE: unlike `executor.map`, the frames are submitted
+            # only as the earlier results are consumed
+            for item in zip(*args):
+                if len(pending) >= MAX_PENDING_FRAMES_PER_JOB * jobs:
+                    yield pending.popleft().result()
+                pending.append(executor.submit(_generate_rois_batch_item, *item))
+            while len(pending) > 0:
+                yield pending.popleft().result()
+        finally:
+            # in case the caller stopped early (or failed)
+            for future in pending:
+                future.cancel()
+
+
+# the reference ROIs and outlines used in `generate_rois_batch`, set once per worker process
+_batch_references: Optional[Tuple[ROISet, ROISet]] = None
+
+
+def _init_batch_worker(reference: ROISet, outline: ROISet):
+    global _batch_references
+    _batch_references = (reference, outline)
+
+
+def _generate_rois_batch_item(*args) -> Union[ROISet, str]:
+    """`_generate_rois_item` with the references set by `_init_batch_worker`."""
+    return _generate_rois_item(*_batch_references, *args)
+
+
+def _generate_rois_item(
+    reference: ROISet,
+    outline: ROISet,
+    alignment: _landmarks.Alignment,
+    metadata: Dict[str, Union[int, str]],
+    resize: bool,
+    outpath: Optional[PathLike] = None,
+    file_type: ResultsFileType = 'hdf',
+    options: Optional[Dict[str, Any]] = None
+) -> Union[ROISet, str]:
+    roiset = generate_rois_single(
+        alignment,
+        metadata,
+        reference=reference,
+        outline=outline,
+        resize=resize
+    )
+    if outpath is None:
+        return roiset
+    roiset.to_file(outpath, file_type, **(options or {}))
+    return _os.fspath(outpath)
 
 
 def generate_rois_single(
@@ -304,19 +588,12 @@ def generate_rois_single(
     metadata: Dict[str, Union[int, str]],
     reference: Optional[ROISet] = None,
     outline: Optional[ROISet] = None,
-    resize: bool = True
+    resize: bool = True,
+    jobs: Optional[int] = 1
 ) -> ROISet:
+    """`jobs` is the number of threads used to warp the masks (see `warp_masks`)."""
 
-    def _warp_ROI(
-        roi: ROI,
-        alignment: _landmarks.Alignment,
-        shape: Optional[Tuple[int, int]] = None
-    ) -> ROI:
-        mask = alignment.warp_image(roi.mask, side=roi.side)
-        if shape is not None:
-            # NOTE: `512` being the 'standard' size used in the pipeline
-            method = _cv2.INTER_CUBIC if max(shape) >= 512 else _cv2.INTER_AREA
-            mask = _cv2.resize(mask, shape, interpolation=method)
+    def _warped_ROI(roi: ROI, mask: _npt.NDArray) -> ROI:
         return ROI(
             name=roi.name,
             side=roi.side,
@@ -329,20 +606,29 @@ def generate_rois_single(
         reference = load_reference_ROIs()
     if outline is None:
         outline = load_reference_outlines()
-    shape = (metadata['Width'], metadata['Height']) if bool(resize) else None
+    if bool(resize):
+        width, height = metadata['Width'], metadata['Height']
+    else:
+        width, height = _defaults.VIDEO_FRAME_SIZE
     
+    source = tuple(outline.rois) + tuple(reference.rois)
+    # NOTE: the merged outline is placed at the head of the same buffer as the warped masks
+    buffer = _np.zeros((len(source) + 1, height, width), dtype=_mask_dtype(source))
+    masks = warp_masks(source, alignment, shape=(width, height), out=buffer[1:], jobs=jobs)
     warped_outlines = tuple(
-        _warp_ROI(roi, alignment, shape=shape) for roi in outline.rois
+        _warped_ROI(roi, mask) for roi, mask in zip(source[:len(outline.rois)], masks)
     )
     warped_rois = tuple(
-        _warp_ROI(roi, alignment, shape=shape) for roi in reference.rois
+        _warped_ROI(roi, mask) for roi, mask in zip(source[len(outline.rois):], masks[len(outline.rois):])
     )
+    # NOTE: the merge is a single (SIMD) pass of OpenCV without any temporaries,
+    # taking a negligible fraction of the time for warping
     merged_outline = ROI(
         name='outline',
         side='both',
         AllenID=-1,
         description='the expected outline of the brain for this ROI set',
-        mask=(warped_outlines[0].mask.astype(_np.uint8) + warped_outlines[1].mask.astype(_np.uint8))
+        mask=_cv2.bitwise_or(warped_outlines[0].mask, warped_outlines[1].mask, dst=buffer[0])
     )
     return ROISet(
         image_name=metadata['Image'],
@@ -352,42 +638,159 @@ def generate_rois_single(
     )
 
 
+def _read_buffers(entries: Sequence[_h5.Dataset]) -> Sequence[Optional[_npt.NDArray]]:
+    """returns the slices of a single (K, H, W) array, into which the datasets
+    can be read using `read_direct`. returns a sequence of None in case
+    the datasets differ in their shapes or dtypes."""
+    if len(set((entry.shape, entry.dtype) for entry in entries)) != 1:
+        return (None,) * len(entries)
+    return _np.empty((len(entries),) + entries[0].shape, dtype=entries[0].dtype)
+
+
+def _load_stacked_rois(group: _h5.Group) -> Tuple[ROI]:
+    """reads the ROIs of a group written using `ROISet.to_hdf(stacked=True)`."""
+    entry = group['masks']
+    data = _np.empty(entry.shape, dtype=entry.dtype)
+    if data.size > 0:
+        entry.read_direct(data)
+    if 'packed_width' in entry.attrs:
+        masks = _np.unpackbits(data, axis=-1, count=int(entry.attrs['packed_width'])).view(bool)
+    elif data.dtype.itemsize == 1:
+        masks = _np.not_equal(data, 0, out=data.view(bool))
+    else:
+        masks = (data != 0)
+    meta = group['meta'][()]
+    return tuple(
+        ROI(
+            name=_as_str(item['name']),
+            side=_as_str(item['side']),
+            AllenID=int(item['AllenID']),
+            description=_as_str(item['description']),
+            mask=mask
+        ) for item, mask in zip(meta, masks)
+    )
+
+
+def _as_str(value: Union[str, bytes]) -> str:
+    return value.decode('utf-8') if isinstance(value, bytes) else value
+
+
+def warp_masks(
+    rois: Tuple[ROI],
+    alignment: _landmarks.Alignment,
+    shape: Optional[Tuple[int, int]] = None,
+    out: Optional[_npt.NDArray] = None,
+    interpolation: int = _cv2.INTER_NEAREST,
+    jobs: Optional[int] = 1
+) -> Tuple[_npt.NDArray]:
+    """warps the masks of `rois` in accordance with their hemispheres,
+    and resizes them to `shape` (width, height) if it is specified.
+
+    the resizing is folded into the warp matrices, so that each mask
+    is sampled only once. by default, the masks are sampled using
+    the nearest-neighbor `interpolation`, so that they remain binary.
+
+    the returned masks are the slices of a single (K, H, W) array.
+    a zero-filled array can be given as `out` to be used instead.
+
+    the masks are warped using `jobs` threads (`None` for the number
+    of CPUs). `jobs=1` (the default) warps them in the current thread."""
+    if shape is None:
+        shape = _defaults.VIDEO_FRAME_SIZE
+    width, height = shape
+    if len(rois) == 0:
+        return ()
+    # NOTE: a single zero-filled buffer for all the masks, of which
+    # only the regions around the warped ROIs are written to
+    if out is None:
+        out = _np.zeros((len(rois), height, width), dtype=_mask_dtype(rois))
+    # NOTE: the warp matrices are computed once per hemisphere (and cached by
+    # `alignment`). precomputed `cv2.remap` maps were found to be much slower,
+    # as they cover the whole frame, whereas each ROI only covers a small region
+    sides = set(roi.side for roi in rois if roi.bounds is not None)
+    warps = dict((side, alignment.warp_matrix(side, size=(width, height))) for side in sides)
+
+    def _warp_single(warped: _npt.NDArray, roi: ROI):
+        if roi.bounds is not None:
+            _landmarks.affine.warp_sparse_image(
+                roi.mask,
+                warps[roi.side],
+                out=warped,
+                bounds=roi.bounds,
+                interpolation=interpolation
+            )
+
+    if jobs == 1:
+        for warped, roi in zip(out, rois):
+            _warp_single(warped, roi)
+    else:
+        # NOTE: OpenCV releases the GIL during the warps,
+        # and each ROI is written to its own slice of `out`
+        with _futures.ThreadPoolExecutor(max_workers=jobs) as executor:
+            for _ in executor.map(_warp_single, out, rois):
+                pass
+    return tuple(out)
+
+
+def _mask_dtype(rois: Sequence[ROI]) -> _np.dtype:
+    return _np.result_type(*(roi.mask.dtype for roi in rois))
+
+
+@_functools.lru_cache(maxsize=1)
 def load_reference_ROIs() -> ROISet:
+    """the same object is returned on every call, so it must not be modified."""
     h5path = default_reference_ROI_path()
     rois = []
     with _h5.File(str(h5path), 'r') as src:
         masks = src['masks']
-        for idx in sorted(masks.keys()):
-            entry = masks[idx]
-            mask = _np.array(entry)
-            metadata = dict((k, v) for k, v in entry.attrs.items())
+        entries = tuple(masks[idx] for idx in sorted(masks.keys()))
+        for entry, buf in zip(entries, _read_buffers(entries)):
+            if buf is None:
+                mask = entry[()]
+            else:
+                entry.read_direct(buf)
+                mask = buf
+            mask.flags.writeable = False
+            metadata = dict(entry.attrs.items())
+            metadata['AllenID'] = int(metadata.get('AllenID', -1))
             rois.append(ROI(mask=mask, **metadata))
     return ROISet(image_name=REFERENCE_NAME, frame_idx=-1, total_frames=-1, rois=tuple(rois))
 
 
+@_functools.lru_cache(maxsize=1)
 def load_reference_outlines() -> ROISet:
+    """the same object is returned on every call, so it must not be modified."""
     left_outline_path, right_outline_path = default_outline_paths()
-    left_outline = _iio.imread(str(left_outline_path))
-    right_outline = _iio.imread(str(right_outline_path))
-    if left_outline.ndim == 3:
-        left_outline = left_outline.mean(-1)
-        right_outline = right_outline.mean(-1)
     outlines = {
-        'left': (left_outline > 0),
-        'right': (right_outline > 0),
+        'left': _read_outline_support(left_outline_path),
+        'right': _read_outline_support(right_outline_path),
     }
     rois = []
-    for side, outline in outlines.items():
+    for side, support in outlines.items():
+        mask = support.view(_np.uint8) * _np.uint8(255)
+        mask.flags.writeable = False
         rois.append(ROI(
             name='outline',
             side=side,
             AllenID=-1,
             description='the expected outline of the brain for this ROI set',
-            mask=outline.astype(_np.uint8) * 255
+            mask=mask
         ))
     return ROISet(image_name=REFERENCE_NAME, frame_idx=-1, total_frames=-1, rois=tuple(rois))
 
 
+def _read_outline_support(path: Path) -> _npt.NDArray:
+    """reads the outline image at `path` as a boolean mask of its non-zero pixels."""
+    # NOTE: the outline images are black-and-white, so that
+    # their grayscale versions have the same non-zero pixels
+    gray = _cv2.imread(str(path), _cv2.IMREAD_GRAYSCALE)
+    if gray is not None:
+        return gray > 0
+    # fall back to imageio for the formats that OpenCV cannot decode
+    outline = _iio.imread(str(path))
+    return outline.any(axis=-1) if outline.ndim == 3 else (outline > 0)
+
+
 def default_reference_ROI_path() -> Path:
     datadir = Path(__file__).parent / DATA_DIR_NAME
     return datadir / ATLAS_MASK_FILE